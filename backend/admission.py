@@ -0,0 +1,238 @@
+import asyncio
+import math
+import os
+import time
+from collections import defaultdict
+from functools import wraps
+
+from quart import jsonify, request
+
+from backend import stage_timing
+
+# Cost is measured in "solve units": one Floquet solve = 1. /analyze-run adds
+# three model calls on top of its solve.
+ROUTE_COSTS = {
+    "/run": 1.0,
+    "/analyze-run": 4.0,
+    "/run-group": 4.0,
+    "/run-trajectories": 4.0,
+    "/run-ensemble": 8.0,
+    "/analyze-messages": 2.0,
+    "/calibrate": 8.0,
+    "/run-bulk": 8.0,
+    "/sensitivities": 8.0,
+}
+# Low-priority routes are shed first once the global budget is under pressure.
+ROUTE_PRIORITY = {
+    "/run": "high",
+    "/analyze-run": "low",
+    "/run-group": "low",
+    "/run-trajectories": "low",
+    "/run-ensemble": "low",
+    "/analyze-messages": "low",
+    "/calibrate": "low",
+    "/run-bulk": "low",
+    "/sensitivities": "low",
+}
+
+CLIENT_BURST = float(os.environ.get("QUPID_CLIENT_BURST", "8"))
+CLIENT_RATE = float(os.environ.get("QUPID_CLIENT_RATE", "0.5"))  # units per second
+GLOBAL_BUDGET = float(os.environ.get("QUPID_MAX_INFLIGHT_COST", "16"))
+LOW_PRIORITY_SHARE = float(os.environ.get("QUPID_LOW_PRIORITY_SHARE", "0.75"))
+QUEUE_TIMEOUT = float(os.environ.get("QUPID_ADMISSION_WAIT", "2.0"))
+MAX_QUEUE_DEPTH = int(os.environ.get("QUPID_ADMISSION_QUEUE", "32"))
+MAX_TRACKED_CLIENTS = 10000
+# Number of reverse proxies in front of the app that append to X-Forwarded-For.
+# 0 (the default) keys clients on the socket peer and ignores the header.
+TRUSTED_PROXY_HOPS = int(os.environ.get("QUPID_TRUSTED_PROXY_HOPS", "0"))
+
+
+class Rejection(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, capacity, rate, now):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class AdmissionController:
+    """
+    Per-client token buckets in front of a global in-flight cost budget.
+
+    State is per server process, so with several hypercorn workers the
+    effective limits scale with the worker count.
+    """
+
+    def __init__(
+        self,
+        costs=None,
+        priorities=None,
+        client_burst=CLIENT_BURST,
+        client_rate=CLIENT_RATE,
+        budget=GLOBAL_BUDGET,
+        low_priority_share=LOW_PRIORITY_SHARE,
+        queue_timeout=QUEUE_TIMEOUT,
+        max_queue_depth=MAX_QUEUE_DEPTH,
+    ):
+        self.costs = dict(ROUTE_COSTS if costs is None else costs)
+        self.priorities = dict(ROUTE_PRIORITY if priorities is None else priorities)
+        self.client_burst = client_burst
+        self.client_rate = client_rate
+        self.budget = budget
+        self.low_priority_share = low_priority_share
+        self.queue_timeout = queue_timeout
+        self.max_queue_depth = max_queue_depth
+
+        self.buckets = {}
+        self.in_flight_cost = 0.0
+        self.queue_depth = 0
+        self.admitted = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self._cond = None
+
+    def _condition(self):
+        # Created lazily so it binds to the serving event loop.
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _take_tokens(self, client, cost):
+        now = time.monotonic()
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            if len(self.buckets) >= MAX_TRACKED_CLIENTS:
+                self._prune(now)
+            bucket = self.buckets[client] = TokenBucket(self.client_burst, now)
+        bucket.refill(self.client_burst, self.client_rate, now)
+        if bucket.tokens < cost:
+            deficit = cost - bucket.tokens
+            raise Rejection(429, "client_rate_limited", deficit / max(self.client_rate, 1e-9))
+        bucket.tokens -= cost
+
+    def _prune(self, now):
+        for client, bucket in list(self.buckets.items()):
+            bucket.refill(self.client_burst, self.client_rate, now)
+            if bucket.tokens >= self.client_burst:
+                del self.buckets[client]
+
+    def _limit_for(self, priority):
+        if priority == "low":
+            return self.budget * self.low_priority_share
+        return self.budget
+
+    def _fits(self, cost, priority):
+        # A request bigger than the whole budget may still run alone.
+        if self.in_flight_cost == 0.0:
+            return True
+        return self.in_flight_cost + cost <= self._limit_for(priority)
+
+    async def _reserve(self, cost, priority):
+        cond = self._condition()
+        async with cond:
+            if not self._fits(cost, priority):
+                if priority == "low" or self.queue_depth >= self.max_queue_depth:
+                    raise Rejection(503, "overloaded", self.queue_timeout)
+                self.queue_depth += 1
+                try:
+                    await asyncio.wait_for(
+                        cond.wait_for(lambda: self._fits(cost, priority)),
+                        timeout=self.queue_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise Rejection(503, "queue_timeout", self.queue_timeout)
+                finally:
+                    self.queue_depth -= 1
+            self.in_flight_cost += cost
+
+    async def admit(self, route, client):
+        cost = self.costs.get(route, 1.0)
+        priority = self.priorities.get(route, "high")
+        try:
+            self._take_tokens(client, cost)
+            try:
+                await self._reserve(cost, priority)
+            except Rejection:
+                # Shed requests do not count against the client's allowance.
+                self.buckets[client].tokens += cost
+                raise
+        except Rejection as rejection:
+            self.rejected[(route, rejection.reason)] += 1
+            raise
+        self.admitted[route] += 1
+        return cost
+
+    async def release(self, cost):
+        cond = self._condition()
+        async with cond:
+            self.in_flight_cost = max(0.0, self.in_flight_cost - cost)
+            cond.notify_all()
+
+    def stats(self):
+        rejected = defaultdict(dict)
+        for (route, reason), count in self.rejected.items():
+            rejected[route][reason] = count
+        return {
+            "in_flight_cost": self.in_flight_cost,
+            "budget": self.budget,
+            "queue_depth": self.queue_depth,
+            "tracked_clients": len(self.buckets),
+            "admitted": dict(self.admitted),
+            "rejected": dict(rejected),
+        }
+
+
+controller = AdmissionController()
+
+
+def client_key():
+    """
+    The peer address, or with TRUSTED_PROXY_HOPS proxies in front, the address
+    the outermost trusted proxy saw. Entries further left in X-Forwarded-For
+    are client-supplied and never used.
+    """
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.remote_addr or "unknown"
+
+
+def rejection_response(rejection):
+    body = {"error": f"request rejected: {rejection.reason}", "retry_after": rejection.retry_after}
+    return jsonify(body), rejection.status, {"Retry-After": str(rejection.retry_after)}
+
+
+def admission_controlled(route):
+    """
+    Wraps a view so it only runs once admitted; rejections become 429/503
+    responses carrying Retry-After.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                with stage_timing.stage("admission"):
+                    cost = await controller.admit(route, client_key())
+            except Rejection as rejection:
+                return rejection_response(rejection)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                await controller.release(cost)
+
+        return wrapper
+
+    return decorator
@@ -1,113 +1,545 @@
+import asyncio
+import json
 import os
 import sys
-from flask import Flask, jsonify, request, send_from_directory
-from flask_cors import CORS
+import threading
+from functools import partial
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-from qupid_time_dependent_floquet import run_simulation
-from backend.message_analyzer import infer_parameters_from_images
-from backend.report_generator import generate_gemini_caption, generate_gemini_report
+from qupid_time_dependent_floquet import run_group_simulation, run_simulation
+from qupid_parallel import default_workers, make_executor
+from qupid_rhythm import activity_envelope
+from qupid_sensitivity import sensitivities
+from qupid_trajectories import DEFAULT_TRAJECTORIES, run_trajectory_simulation
+from backend.admission import Rejection, admission_controlled, client_key, controller as admission, rejection_response
+from backend.bulk import PROGRESS_EVERY, ndjson_lines, score_lines_async
+from backend.calibration import DEFAULT_GENERATIONS, calibrate_parameters
+from backend.ensemble import DEFAULT_MEMBERS, run_ensemble
+from backend.executors import in_flight, maybe_recycle_pool, pool_pids, pool_stats, run_solver, shutdown_pool
+from backend import corpus, memory_monitor, stage_timing
+from backend.history_store import merge_params, store as history_store
+from backend.message_analyzer import (
+    _most_common_senders,
+    infer_parameters_async,
+    infer_parameters_from_images_async,
+    parse_messages_from_upload,
+)
+from backend.report_generator import generate_gemini_caption_async, generate_gemini_report_async
+from backend.run_index import DEFAULT_NEIGHBORS, index as run_index, indexable, interpolate
+from backend.single_flight import coalescer, content_key, upload_key
+from backend.simulation_args import build_group_args, build_simulation_args, describe_levers, slider_sensitivities
+from backend.static_assets import AssetIndex, asset_headers, not_modified, select_variant
 
 FRONTEND_DIST = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "qupid-app", "dist")
 )
-app = Flask(__name__, static_folder=FRONTEND_DIST, static_url_path="")
-CORS(app)
+# Static files are served from a prebuilt in-memory index (see serve_react),
+# so Quart's own static route is disabled.
+app = Quart(__name__, static_folder=None)
+app = cors(app)
+asset_index = AssetIndex(FRONTEND_DIST)
+
+
+@app.before_request
+async def start_memory_sample():
+    g.memory_sample = memory_monitor.begin_request_sample()
+
+
+@app.before_request
+async def start_stage_timings():
+    g.stage_timings = stage_timing.begin()
+
+
+@app.before_request
+async def record_corpus():
+    if corpus.RECORD_PATH and request.method == "POST":
+        await corpus.record(request)
+
+
+@app.after_request
+async def check_memory(response):
+    maybe_recycle_pool()
+    memory_monitor.check_rss(pool_pids())
+    return response
+
+
+@app.teardown_request
+async def finish_memory_sample(exc):
+    # Teardown runs even when the view raised, so the active-request count stays right.
+    memory_monitor.end_request_sample(
+        request.url_rule.rule if request.url_rule else request.path,
+        g.get("memory_sample", False),
+        pool_pids(),
+    )
+
 
+@app.after_request
+async def add_server_timing(response):
+    timings = g.get("stage_timings")
+    if timings:
+        response.headers["Server-Timing"] = stage_timing.server_timing(timings)
+    return response
 
-def to_unit(value):
+
+@app.after_serving
+async def drain_solver_pool():
+    # Runs once the server has stopped accepting requests; finish queued solves.
+    await asyncio.get_running_loop().run_in_executor(None, shutdown_pool)
+
+
+@app.route("/memory", methods=["GET"])
+async def memory_stats():
     try:
-        return float(value) / 100.0
-    except (TypeError, ValueError):
-        return 0.0
-
-
-def build_simulation_args(payload):
-    omega_A = to_unit(payload.get("personATemperarment"))
-    omega_B = to_unit(payload.get("personBTemperarment"))
-    J_empathy = to_unit(payload.get("mutualEmpathy"))
-    J_compatability = to_unit(payload.get("mutualCompatability"))
-    drive_amplitude = to_unit(payload.get("mutualStrength"))
-    drive_freq = to_unit(payload.get("mutualFrequency"))
-
-    rate_bit_flip_A = to_unit(payload.get("personAHotCold"))
-    rate_dephase_A = to_unit(payload.get("personADistant"))
-    rate_decay_A = to_unit(payload.get("personABurnedOut"))
-
-    rate_bit_flip_B = to_unit(payload.get("personBHotCold"))
-    rate_dephase_B = to_unit(payload.get("personBDistant"))
-    rate_decay_B = to_unit(payload.get("personBBurnedOut"))
-
-    mutual_sync = payload.get("mutualSync", 0)
-    rate_anti_corr = to_unit(100 - float(mutual_sync or 0))
-    rate_coll_decay = to_unit(payload.get("mutualCodependence"))
-
-    return {
-        "omega_A": omega_A,
-        "omega_B": omega_B,
-        "J_empathy": J_empathy,
-        "J_compatability": J_compatability,
-        "drive_amplitude": drive_amplitude,
-        "drive_freq": drive_freq,
-        "rate_bit_flip_A": rate_bit_flip_A,
-        "rate_dephase_A": rate_dephase_A,
-        "rate_decay_A": rate_decay_A,
-        "rate_bit_flip_B": rate_bit_flip_B,
-        "rate_dephase_B": rate_dephase_B,
-        "rate_decay_B": rate_decay_B,
-        "rate_anti_corr": rate_anti_corr,
-        "rate_coll_decay": rate_coll_decay,
-    }
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+    if not 0 <= limit <= 1000:
+        return jsonify({"error": "limit must be between 0 and 1000."}), 400
+    stats = await asyncio.get_running_loop().run_in_executor(None, partial(memory_monitor.stats, limit, pool_pids()))
+    stats["solver_pool"] = pool_stats()
+    return jsonify(stats)
+
+
+async def shared_simulation(sim_args, params=None):
+    """
+    run_simulation on the solver pool, coalesced with identical in-flight solves.
+    With `params` (the 0-100 sliders behind sim_args) the run is added to the
+    similarity index.
+    """
+    results = await coalescer.run("simulation", content_key(sim_args), partial(run_solver, run_simulation, sim_args))
+    if params is not None and indexable(sim_args):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                partial(
+                    run_index.record,
+                    params,
+                    results["health_score"],
+                    results["trajectory_metrics"],
+                    results.get("trajectory"),
+                ),
+            )
+        except Exception as exc:
+            print(f"[qupid] run index write failed: {exc}", file=sys.stderr)
+    return results
+
+
+async def shared_sensitivities(sim_args):
+    """
+    Sensitivities for /run's backend (qupid_sensitivity) on the solver pool, coalesced likewise.
+    """
+    return await coalescer.run("sensitivities", content_key(sim_args), partial(run_solver, sensitivities, sim_args))
+
+
+@app.route("/admission", methods=["GET"])
+async def admission_stats():
+    stats = admission.stats()
+    stats["solver_in_flight"] = in_flight()
+    stats["single_flight"] = coalescer.stats()
+    return jsonify(stats)
 
 
 @app.route("/run", methods=["POST"])
-def run_qupid():
-    payload = request.get_json(force=True) or {}
-    results = run_simulation(build_simulation_args(payload))
+@admission_controlled("/run")
+async def run_qupid():
+    payload = await request.get_json(force=True) or {}
+    try:
+        results = await shared_simulation(build_simulation_args(payload), payload)
+    except ValueError as exc:
+        return jsonify({"error": f"invalid parameters: {exc}"}), 400
 
     print(results["report_text"])
     return jsonify(results)
 
 
+@app.route("/sensitivities", methods=["POST"])
+@admission_controlled("/sensitivities")
+async def run_sensitivities():
+    """
+    Same payload as /run. Derivatives of the health score and metrics per
+    slider point, and the sliders ranked by their effect on the score.
+    """
+    payload = await request.get_json(force=True) or {}
+    try:
+        result = await shared_sensitivities(build_simulation_args(payload))
+    except ValueError as exc:
+        return jsonify({"error": f"invalid parameters: {exc}"}), 400
+    return jsonify({
+        "health_score": result["health_score"],
+        "trajectory_metrics": result["trajectory_metrics"],
+        "solver": result["solver"],
+        **slider_sensitivities(result),
+    })
+
+
+@app.route("/run-group", methods=["POST"])
+@admission_controlled("/run-group")
+async def run_group():
+    payload = await request.get_json(force=True) or {}
+    try:
+        group_args = build_group_args(payload)
+        results = await coalescer.run(
+            "group_simulation", content_key(group_args), partial(run_solver, run_group_simulation, group_args)
+        )
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": f"invalid group: {exc}"}), 400
+    return jsonify(results)
+
+
+@app.route("/run-trajectories", methods=["POST"])
+async def run_trajectories():
+    """
+    Quantum-trajectory (Monte Carlo wavefunction) run. Streams NDJSON: one
+    "progress" line per finished batch with running means and standard errors,
+    then a final "result" line.
+    """
+    payload = await request.get_json(force=True) or {}
+    try:
+        ntraj = int(payload.get("trajectories") or DEFAULT_TRAJECTORIES)
+        seed = int(payload.get("seed") or 0)
+        sim_args = build_simulation_args(payload)
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": f"invalid parameters: {exc}"}), 400
+
+    try:
+        with stage_timing.stage("admission"):
+            cost = await admission.admit("/run-trajectories", client_key())
+    except Rejection as rejection:
+        return rejection_response(rejection)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancel = threading.Event()
+
+    def on_progress(snapshot):
+        loop.call_soon_threadsafe(queue.put_nowait, {"type": "progress", **snapshot})
+
+    # The driver fans batches out to its own worker processes, so it only
+    # needs a thread here.
+    job = loop.run_in_executor(
+        None,
+        partial(run_trajectory_simulation, sim_args, ntraj=ntraj, seed=seed, on_progress=on_progress, cancel=cancel),
+    )
+    job.add_done_callback(lambda _: queue.put_nowait(None))
+
+    def release_when_done(done):
+        if not done.cancelled():
+            done.exception()  # mark retrieved; a cancelled run ends in RuntimeError
+        loop.create_task(admission.release(cost))
+
+    async def stream():
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield json.dumps(item) + "\n"
+            try:
+                yield json.dumps({"type": "result", **(await job)}) + "\n"
+            except Exception as exc:
+                yield json.dumps({"type": "error", "error": f"trajectory solver failed: {exc}"}) + "\n"
+        finally:
+            # On disconnect, queued batches are dropped; the cost stays held
+            # until the batches already running have finished.
+            cancel.set()
+            job.add_done_callback(release_when_done)
+
+    return Response(stream(), mimetype="application/x-ndjson")
+
+
+@app.route("/run-bulk", methods=["POST"])
+async def run_bulk():
+    """
+    Scores an NDJSON body of slider payloads with no plotting and streams one
+    NDJSON result line per input line (in input order unless ?ordered=0).
+    With ?progress=1, {"type": "progress"} lines are interleaved.
+    """
+    try:
+        with stage_timing.stage("admission"):
+            cost = await admission.admit("/run-bulk", client_key())
+    except Rejection as rejection:
+        return rejection_response(rejection)
+
+    ordered = request.args.get("ordered", "1") != "0"
+    with_progress = request.args.get("progress") == "1"
+    workers = default_workers()
+    pool = make_executor(workers, thread_name_prefix="qupid-bulk")
+    body = request.body
+
+    async def stream():
+        rows_done = errors = 0
+        next_report = PROGRESS_EVERY
+        try:
+            async for rows in score_lines_async(ndjson_lines(body), pool, ordered=ordered, max_pending=workers * 2):
+                rows_done += len(rows)
+                errors += sum(1 for row in rows if "error" in row)
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+                if with_progress and rows_done >= next_report:
+                    next_report = (rows_done // PROGRESS_EVERY + 1) * PROGRESS_EVERY
+                    yield json.dumps({"type": "progress", "rows": rows_done, "errors": errors}) + "\n"
+            if with_progress:
+                yield json.dumps({"type": "done", "rows": rows_done, "errors": errors}) + "\n"
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+            await admission.release(cost)
+
+    return Response(stream(), mimetype="application/x-ndjson")
+
+
+@app.route("/run-ensemble", methods=["POST"])
+@admission_controlled("/run-ensemble")
+async def run_ensemble_route():
+    payload = await request.get_json(force=True) or {}
+    try:
+        members = int(payload.get("members") or DEFAULT_MEMBERS)
+        results = await asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(run_ensemble, payload, members=members, spread=payload.get("spread"), seed=int(payload.get("seed") or 0)),
+        )
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": f"invalid parameters: {exc}"}), 400
+    return jsonify(results)
+
+
+@app.route("/analyze-messages", methods=["POST"])
+@admission_controlled("/analyze-messages")
+async def analyze_messages():
+    """
+    Text-export analysis with incremental re-analysis: a re-upload of a stored
+    conversation only sends the new messages (plus a little context) to the
+    model and blends the result with the stored parameters. With the form field
+    drive=rhythm the drive follows the chat's own timeline (qupid_rhythm); with
+    a checkpoint field (JSON, from an earlier response) the run continues from it.
+    """
+    files = await request.files
+    upload = files.get("file")
+    if upload is None:
+        return jsonify({"error": "missing conversation. send multipart/form-data with 'file' (.txt, .csv or .json)."}), 400
+
+    form = await request.form
+    rhythm = form.get("drive") == "rhythm"
+    resume = bool(form.get("checkpoint")) and not rhythm
+    loop = asyncio.get_running_loop()
+    try:
+        messages = parse_messages_from_upload(upload)
+        if not messages:
+            raise ValueError("No valid messages found in the uploaded file.")
+        plan = await loop.run_in_executor(None, history_store.plan, messages)
+        senders = plan["senders"] or _most_common_senders(messages)
+        previous = plan["previous"]
+
+        # An unchanged upload still runs when asked for a rhythm drive or to extend a checkpoint.
+        if plan["unchanged"] and not rhythm and not resume:
+            return jsonify({
+                "fingerprint": plan["fingerprint"],
+                "incremental": True,
+                "new_messages": 0,
+                "health_score": previous["health_score"],
+                "trajectory_metrics": previous["trajectory_metrics"],
+                "inferred_params": previous["inferred_params"],
+                "messages_analyzed": len(messages),
+            })
+
+        new_messages = len(messages) - plan["new_start"]
+        if plan["unchanged"]:
+            inferred_params, analyzer_debug = previous["inferred_params"], {}
+        else:
+            tail_params, analyzer_debug = await coalescer.run(
+                "message_analysis",
+                content_key([plan["inference_window"], senders]),
+                partial(infer_parameters_async, plan["inference_window"], senders=senders),
+            )
+            inferred_params = merge_params(
+                previous["inferred_params"] if previous else None,
+                plan["previous_count"],
+                tail_params,
+                new_messages,
+            )
+
+        sim_args = build_simulation_args(inferred_params)
+        if rhythm:
+            sim_args["drive_envelope"] = activity_envelope(m.get("timestamp") for m in messages)
+        elif resume:
+            # Continue the previous upload's trajectory under the updated parameters.
+            sim_args["checkpoint"] = json.loads(form["checkpoint"])
+            sim_args["extend_periods"] = form.get("extendPeriods")
+        sim_results = await shared_simulation(sim_args, inferred_params)
+        # The stored score series tracks the periodic drive over the default horizon only,
+        # so rhythm runs and stitched checkpoint extensions stay out of it.
+        if not rhythm and not resume:
+            await loop.run_in_executor(
+                None,
+                partial(
+                    history_store.record,
+                    plan["fingerprint"],
+                    messages,
+                    senders,
+                    plan["new_start"],
+                    inferred_params,
+                    sim_results["trajectory_metrics"],
+                    sim_results["health_score"],
+                ),
+            )
+        elif rhythm:
+            sim_results["drive_envelope"] = sim_args["drive_envelope"]
+    except Exception as exc:
+        return jsonify({"error": f"analyzer failed: {exc}"}), 400
+
+    sim_results.update({
+        "fingerprint": plan["fingerprint"],
+        "incremental": previous is not None,
+        "new_messages": new_messages,
+        "inferred_params": inferred_params,
+        "analyzer_debug": analyzer_debug,
+        "messages_analyzed": len(messages),
+    })
+    return jsonify(sim_results)
+
+
+@app.route("/calibrate", methods=["POST"])
+@admission_controlled("/calibrate")
+async def calibrate():
+    """
+    Fits the sliders to the sentiment dynamics of a timestamped chat export,
+    warm-started from the model's inferred parameters, then simulates the fit.
+    """
+    files = await request.files
+    form = await request.form
+    upload = files.get("file")
+    if upload is None:
+        return jsonify({"error": "missing conversation. send multipart/form-data with 'file' (.txt, .csv or .json)."}), 400
+
+    loop = asyncio.get_running_loop()
+    try:
+        messages = parse_messages_from_upload(upload)
+        if not messages:
+            raise ValueError("No valid messages found in the uploaded file.")
+        senders = _most_common_senders(messages)
+        guess, analyzer_debug = await coalescer.run(
+            "message_analysis",
+            content_key([messages, senders]),
+            partial(infer_parameters_async, messages, senders=senders),
+        )
+        fit = await loop.run_in_executor(
+            None,
+            partial(
+                calibrate_parameters,
+                messages,
+                senders,
+                guess,
+                max_generations=int(form.get("generations") or DEFAULT_GENERATIONS),
+                seed=int(form.get("seed") or 0),
+                warm_starts=await loop.run_in_executor(None, run_index.warm_starts, guess),
+            ),
+        )
+        sim_results = await shared_simulation(build_simulation_args(fit["fitted_params"]), fit["fitted_params"])
+    except Exception as exc:
+        return jsonify({"error": f"calibration failed: {exc}"}), 400
+
+    sim_results.update({
+        "guess_params": guess,
+        "inferred_params": fit.pop("fitted_params"),
+        "calibration": fit,
+        "analyzer_debug": analyzer_debug,
+        "messages_analyzed": len(messages),
+    })
+    return jsonify(sim_results)
+
+
+@app.route("/similar", methods=["POST"])
+async def similar_runs():
+    """
+    Slider payload as for /run, plus optional k. The k nearest past runs and an
+    interpolated score/metrics estimate, from the index only (no solve).
+    """
+    payload = await request.get_json(force=True) or {}
+    try:
+        k = min(max(int(payload.get("k") or DEFAULT_NEIGHBORS), 1), 50)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer."}), 400
+    neighbors = await asyncio.get_running_loop().run_in_executor(None, run_index.neighbors, payload, k)
+    return jsonify({"neighbors": neighbors, "estimate": interpolate(neighbors), "index": run_index.stats()})
+
+
+@app.route("/history", methods=["GET"])
+async def history():
+    fingerprint = request.args.get("fingerprint", "").strip()
+    if not fingerprint:
+        return jsonify({"error": "missing fingerprint query parameter."}), 400
+    series = await asyncio.get_running_loop().run_in_executor(None, history_store.history, fingerprint)
+    return jsonify({"fingerprint": fingerprint, "analyses": series})
+
+
 @app.route("/analyze-run", methods=["POST"])
-def analyze_and_run():
-    uploaded_files = request.files.getlist("files")
+@admission_controlled("/analyze-run")
+async def analyze_and_run():
+    files = await request.files
+    uploaded_files = files.getlist("files")
     if not uploaded_files:
-        single = request.files.get("file")
+        single = files.get("file")
         if single:
             uploaded_files = [single]
     if not uploaded_files:
         return jsonify({"error": "missing screenshots. send multipart/form-data with 'files' (up to 10 images)."}), 400
 
     try:
-        inferred_params, analyzer_debug = infer_parameters_from_images(uploaded_files)
-        sim_results = run_simulation(build_simulation_args(inferred_params))
+        inferred_params, analyzer_debug = await coalescer.run(
+            "image_analysis", upload_key(uploaded_files), partial(infer_parameters_from_images_async, uploaded_files)
+        )
+        form = await request.form
+        ensemble_members = int(form.get("ensemble") or 0)
+        # The levers behind the report's INTERVENTIONS are solved beside the simulation.
+        levers_task = asyncio.ensure_future(shared_sensitivities(build_simulation_args(inferred_params)))
+        if ensemble_members:
+            # The ensemble driver fans out to its own workers; run it beside the nominal solve.
+            sim_results, ensemble = await asyncio.gather(
+                shared_simulation(build_simulation_args(inferred_params), inferred_params),
+                asyncio.get_running_loop().run_in_executor(
+                    None, partial(run_ensemble, inferred_params, members=ensemble_members)
+                ),
+            )
+            sim_results["ensemble"] = ensemble
+        else:
+            sim_results = await shared_simulation(build_simulation_args(inferred_params), inferred_params)
         sim_results["inferred_params"] = inferred_params
         sim_results["analyzer_debug"] = analyzer_debug
         sim_results["screenshots_analyzed"] = len(uploaded_files)
 
         try:
-            report_text = generate_gemini_report(
+            levers = slider_sensitivities(await levers_task)["ranked"]
+            sim_results["levers"] = levers
+        except Exception as exc:
+            levers = []
+            sim_results["analyzer_debug"]["sensitivity_error"] = str(exc)
+
+        # The report and caption are independent model calls; await them together.
+        report_text, caption_text = await asyncio.gather(
+            generate_gemini_report_async(
                 plot_b64=sim_results.get("plot_base64"),
                 trajectory_metrics=sim_results.get("trajectory_metrics"),
                 inferred_params=inferred_params,
                 conversation_insights=analyzer_debug.get("conversationInsights"),
-            )
-            if report_text.strip():
-                sim_results["report_text"] = report_text.strip()
-
-            caption_text = generate_gemini_caption(
+                levers=describe_levers(levers),
+            ),
+            generate_gemini_caption_async(
                 plot_b64=sim_results.get("plot_base64"),
                 trajectory_metrics=sim_results.get("trajectory_metrics"),
                 inferred_params=inferred_params,
-            )
-            if caption_text:
-                sim_results["plot_caption"] = caption_text
-        except Exception as exc:
-            sim_results["analyzer_debug"]["report_error"] = f"gemini_report_failed: {exc}"
+            ),
+            return_exceptions=True,
+        )
+        report_errors = [r for r in (report_text, caption_text) if isinstance(r, Exception)]
+        if not isinstance(report_text, Exception) and report_text.strip():
+            sim_results["report_text"] = report_text.strip()
+        if not isinstance(caption_text, Exception) and caption_text:
+            sim_results["plot_caption"] = caption_text
+        if report_errors:
+            sim_results["analyzer_debug"]["report_error"] = f"gemini_report_failed: {report_errors[0]}"
 
         print(sim_results["report_text"])
         return jsonify(sim_results)
@@ -117,13 +549,20 @@ def analyze_and_run():
 
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
-def serve_react(path):
-    target = os.path.join(FRONTEND_DIST, path)
-    if path and os.path.exists(target):
-        return send_from_directory(FRONTEND_DIST, path)
-    return send_from_directory(FRONTEND_DIST, "index.html")
+async def serve_react(path):
+    asset = asset_index.resolve(path)
+    if asset is None:
+        return jsonify({"error": "frontend not built. run `npm run build` in qupid-app."}), 404
+
+    encoding = select_variant(asset, request.headers.get("Accept-Encoding"))
+    headers = asset_headers(asset, encoding)
+    if not_modified(asset, request.headers.get("If-None-Match")):
+        return Response(b"", status=304, headers=headers)
+    body, _ = asset.variants[encoding]
+    return Response(body, headers=headers)
 
 
 if __name__ == "__main__":
+    # Development server only; production runs under hypercorn (see start.sh).
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("QUPID_DEBUG") == "1")
@@ -0,0 +1,214 @@
+"""
+Bulk scoring of slider payloads (the build_simulation_args schema) from NDJSON,
+with no plotting or report text. Rows are scored in parallel chunks with a
+bounded number of chunks in flight, so input of any length runs in constant
+memory. Each input line yields one output line:
+
+    {"index": 0, "id": ..., "health_score": 71.3, "trajectory_metrics": {...}, "solver": "..."}
+    {"index": 1, "id": ..., "error": "..."}
+
+`python qupid_time_dependent_floquet.py bulk in.ndjson -o out.ndjson` runs it
+from the command line.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from qupid_parallel import default_workers, make_executor
+from qupid_time_dependent_floquet import calculate_hybrid_score, compute_trajectory_metrics, solve_couple
+from backend.simulation_args import build_simulation_args
+
+DEFAULT_CHUNK_SIZE = 16
+# Longer lines are answered with an error row and are never held in memory whole.
+MAX_LINE_BYTES = int(os.environ.get("QUPID_BULK_MAX_LINE_BYTES", str(1 << 20)))
+PENDING_CHUNKS_PER_WORKER = 2
+PROGRESS_EVERY = 1000
+
+
+def score_payload(payload):
+    tlist, happiness_A, happiness_B, final_rho, solver_info = solve_couple(build_simulation_args(payload))
+    return {
+        "health_score": calculate_hybrid_score(tlist, happiness_A, happiness_B, final_rho),
+        "trajectory_metrics": compute_trajectory_metrics(tlist, happiness_A, happiness_B),
+        "solver": solver_info["solver"],
+    }
+
+
+def score_chunk(rows):
+    """
+    rows: [(index, raw NDJSON line)], with None for a line over MAX_LINE_BYTES.
+    Bad lines become error rows instead of failing the chunk.
+    """
+    out = []
+    for index, line in rows:
+        row = {"index": index}
+        try:
+            if line is None:
+                raise ValueError(f"line longer than {MAX_LINE_BYTES} bytes")
+            payload = json.loads(line)
+            if not isinstance(payload, dict):
+                raise ValueError("each line must be a JSON object")
+            if "id" in payload:
+                row["id"] = payload["id"]
+            row.update(score_payload(payload))
+        except Exception as exc:
+            row["error"] = str(exc)
+        out.append(row)
+    return out
+
+
+def _chunks(lines, chunk_size):
+    chunk = []
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append((index, line if len(line) <= MAX_LINE_BYTES else None))
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_lines(lines, workers=None, ordered=True, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """
+    Scores an iterable of NDJSON lines, yielding result rows in input order
+    (ordered=True) or as chunks complete.
+    """
+    workers = workers or default_workers()
+    max_pending = workers * PENDING_CHUNKS_PER_WORKER
+    done_rows = 0
+    errors = 0
+    started = time.perf_counter()
+
+    def finished(rows):
+        nonlocal done_rows, errors
+        done_rows += len(rows)
+        errors += sum(1 for row in rows if "error" in row)
+        if on_progress is not None:
+            on_progress({"rows": done_rows, "errors": errors, "seconds": time.perf_counter() - started})
+        return rows
+
+    with make_executor(workers, thread_name_prefix="qupid-bulk") as pool:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_size):
+            pending.append(pool.submit(score_chunk, chunk))
+            while len(pending) >= max_pending:
+                if ordered:
+                    yield from finished(pending.popleft().result())
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield from finished(future.result())
+        while pending:
+            yield from finished(pending.popleft().result())
+
+
+async def score_lines_async(lines, pool, ordered=True, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=4):
+    """
+    Async variant for the HTTP endpoint: `lines` is an async iterator of NDJSON
+    lines and chunks run on `pool`. Yields lists of result rows.
+    """
+    loop = asyncio.get_running_loop()
+    pending = deque()
+    chunk = []
+    index = 0
+
+    async def drain(limit):
+        while len(pending) > limit:
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+
+    async for line in lines:
+        if line is not None:
+            line = line.strip()
+            if not line:
+                continue
+        chunk.append((index, line))
+        index += 1
+        if len(chunk) >= chunk_size:
+            pending.append(loop.run_in_executor(pool, score_chunk, chunk))
+            chunk = []
+            async for rows in drain(max_pending - 1):
+                yield rows
+    if chunk:
+        pending.append(loop.run_in_executor(pool, score_chunk, chunk))
+    async for rows in drain(0):
+        yield rows
+
+
+async def ndjson_lines(body):
+    """
+    Splits a streamed request body into lines without buffering all of it.
+    A line over MAX_LINE_BYTES is yielded as None and the rest of it skipped.
+    """
+    buffer = b""
+    skipping = False
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                # The tail of a line already reported as too long.
+                skipping = False
+                continue
+            yield line.decode("utf-8", errors="replace") if len(line) <= MAX_LINE_BYTES else None
+        if len(buffer) > MAX_LINE_BYTES:
+            if not skipping:
+                yield None
+                skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield buffer.decode("utf-8", errors="replace") if len(buffer) <= MAX_LINE_BYTES else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="qupid_time_dependent_floquet.py bulk", description="Score NDJSON slider payloads.")
+    parser.add_argument("input", help="NDJSON file of slider payloads, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--unordered", action="store_true", help="emit rows as they complete")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    args = parser.parse_args(argv)
+
+    next_report = PROGRESS_EVERY
+
+    def progress(snapshot):
+        nonlocal next_report
+        if args.quiet or snapshot["rows"] < next_report:
+            return
+        next_report = (snapshot["rows"] // PROGRESS_EVERY + 1) * PROGRESS_EVERY
+        rate = snapshot["rows"] / max(snapshot["seconds"], 1e-9)
+        print(f"[qupid] {snapshot['rows']} rows, {snapshot['errors']} errors, {rate:.1f} rows/s", file=sys.stderr)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for row in score_lines(
+            source,
+            workers=args.workers or None,
+            ordered=not args.unordered,
+            chunk_size=args.chunk_size,
+            on_progress=progress,
+        ):
+            sink.write(json.dumps(row) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
@@ -0,0 +1,206 @@
+import time
+from functools import partial
+
+import numpy as np
+
+from qupid_group_dynamics import IntegrationError
+from qupid_parallel import default_workers, make_executor
+from qupid_time_dependent_floquet import simulate_couple
+from backend.message_analyzer import _sentiment_score
+from backend.simulation_args import SLIDER_FLOORS, SLIDER_KEYS, build_simulation_args
+
+DEFAULT_BINS = 24
+DEFAULT_GENERATIONS = 12
+DEFAULT_PATIENCE = 3
+DEFAULT_STEP = 12.0  # initial search radius, in slider points
+MIN_STEP = 1.0
+IMPROVEMENT_TOL = 1e-3
+SMOOTHING = 0.5  # EMA weight of the current bin
+
+
+def _positions(messages):
+    """
+    Message positions on [0, 1]: by timestamp when the export has them,
+    otherwise by message order.
+    """
+    stamps = [m.get("timestamp") for m in messages]
+    if all(stamps) and stamps[0] != stamps[-1]:
+        seconds = np.array([(ts - stamps[0]).total_seconds() for ts in stamps])
+    else:
+        seconds = np.arange(len(messages), dtype=float)
+    span = seconds[-1] - seconds[0] if len(seconds) > 1 else 0.0
+    return (seconds - seconds[0]) / span if span > 0 else np.zeros(len(messages))
+
+
+def sentiment_series(messages, senders, n_bins=DEFAULT_BINS):
+    """
+    Per-partner sentiment over the conversation, binned on [0, 1], EMA-smoothed
+    and scaled onto the [-1, 1] range of ⟨σz⟩. Bins where a partner said
+    nothing carry zero weight in the fit.
+    """
+    positions = _positions(messages)
+    bins = np.minimum((positions * n_bins).astype(int), n_bins - 1)
+    series = {}
+    for label, sender in zip(("A", "B"), senders):
+        totals = np.zeros(n_bins)
+        counts = np.zeros(n_bins)
+        for idx, message in zip(bins, messages):
+            if message.get("sender") == sender:
+                totals[idx] += _sentiment_score(message.get("text"))
+                counts[idx] += 1
+        smoothed = np.zeros(n_bins)
+        level = None
+        for idx in range(n_bins):
+            if counts[idx]:
+                value = totals[idx] / counts[idx]
+                level = value if level is None else SMOOTHING * value + (1 - SMOOTHING) * level
+            smoothed[idx] = level or 0.0
+        series[label] = smoothed
+        series[f"weights_{label}"] = counts
+
+    scale = np.percentile(np.abs(np.concatenate([series["A"], series["B"]])), 95)
+    if scale > 0:
+        series["A"] = np.clip(series["A"] / scale, -1.0, 1.0)
+        series["B"] = np.clip(series["B"] / scale, -1.0, 1.0)
+    series["positions"] = (np.arange(n_bins) + 0.5) / n_bins
+    return series
+
+
+def trajectory_residuals(tlist, happiness_A, happiness_B, observed):
+    """
+    Simulated ⟨σz⟩ minus observed sentiment at each bin, with the run mapped
+    onto the conversation's span. Returns (weighted MSE, residuals_A, residuals_B).
+    """
+    times = observed["positions"] * tlist[-1]
+    res_A = np.interp(times, tlist, happiness_A) - observed["A"]
+    res_B = np.interp(times, tlist, happiness_B) - observed["B"]
+    w_A, w_B = observed["weights_A"], observed["weights_B"]
+    total = w_A.sum() + w_B.sum()
+    if total <= 0:
+        return 0.0, res_A, res_B
+    mismatch = float((w_A * res_A ** 2).sum() + (w_B * res_B ** 2).sum()) / total
+    return mismatch, res_A, res_B
+
+
+def _evaluate_candidates(rows, observed):
+    # A candidate with invalid parameters or a failed integration is ranked last
+    # instead of aborting the fit; any other error propagates.
+    out = []
+    for row in rows:
+        try:
+            tlist, happiness_A, happiness_B, _ = simulate_couple(build_simulation_args(dict(zip(SLIDER_KEYS, row))))
+        except (ValueError, IntegrationError):
+            out.append(np.inf)
+            continue
+        out.append(trajectory_residuals(tlist, happiness_A, happiness_B, observed)[0])
+    return out
+
+
+def calibrate_parameters(
+    messages,
+    senders,
+    guess,
+    n_bins=DEFAULT_BINS,
+    batch_size=None,
+    max_generations=DEFAULT_GENERATIONS,
+    patience=DEFAULT_PATIENCE,
+    step=DEFAULT_STEP,
+    seed=0,
+    workers=None,
+    time_budget=None,
+    warm_starts=None,
+):
+    """
+    Fits the 14 sliders to the conversation's sentiment dynamics with a
+    derivative-free evolution strategy. Starts from `guess` (the model's
+    inferred parameters), or from whichever of `warm_starts` (slider dicts,
+    e.g. similar past runs) fits better, evaluates each generation as one
+    parallel batch and stops once the search radius collapses or `patience`
+    generations pass without improvement.
+    """
+    started = time.perf_counter()
+    observed = sentiment_series(messages, senders, n_bins)
+    workers = workers or default_workers()
+    batch_size = int(batch_size or max(8, workers * 2))
+    n_elite = max(2, batch_size // 4)
+    elite_weights = np.log(n_elite + 0.5) - np.log(np.arange(1, n_elite + 1))
+    elite_weights /= elite_weights.sum()
+
+    rng = np.random.default_rng(seed)
+    floors = np.array([SLIDER_FLOORS.get(key, 0) for key in SLIDER_KEYS])
+    mean = np.clip(np.array([float(guess.get(key) or 0) for key in SLIDER_KEYS]), floors, 100)
+    # Candidates are whole slider points, which keeps drive caches warm and lets
+    # repeated samples reuse earlier evaluations.
+    seen = {}
+
+    def evaluate(pool, candidates):
+        fresh = [c for c in dict.fromkeys(map(tuple, candidates)) if c not in seen]
+        if fresh:
+            chunks = [chunk.tolist() for chunk in np.array_split(np.array(fresh), min(len(fresh), workers * 2))]
+            scores = [s for chunk in pool.map(partial(_evaluate_candidates, observed=observed), chunks) for s in chunk]
+            seen.update(zip(fresh, scores))
+        return np.array([seen[tuple(c)] for c in candidates])
+
+    generations = 0
+    stall = 0
+    stop_reason = "max_generations"
+    trace = []
+    with make_executor(workers, thread_name_prefix="qupid-calibrate") as pool:
+        start_point = np.rint(mean)
+        starts = [start_point] + [
+            np.clip(np.rint([float(start.get(key) or 0) for key in SLIDER_KEYS]), floors, 100) for start in warm_starts or []
+        ]
+        start_scores = evaluate(pool, starts)
+        initial = float(start_scores[0])
+        best_start = int(np.argmin(start_scores))
+        best, best_mismatch = starts[best_start], float(start_scores[best_start])
+        if not np.isfinite(best_mismatch):
+            raise ValueError("the starting parameters could not be simulated")
+        mean = best.astype(float)
+        trace.append(best_mismatch)
+
+        while generations < max_generations:
+            if time_budget and time.perf_counter() - started > time_budget:
+                stop_reason = "time_budget"
+                break
+            if step < MIN_STEP:
+                stop_reason = "converged"
+                break
+            generations += 1
+            candidates = np.clip(np.rint(mean + rng.standard_normal((batch_size, len(SLIDER_KEYS))) * step), floors, 100)
+            scores = evaluate(pool, candidates)
+            order = np.argsort(scores)
+            mean = elite_weights @ candidates[order[:n_elite]]
+
+            if scores[order[0]] < best_mismatch * (1 - IMPROVEMENT_TOL):
+                best, best_mismatch = candidates[order[0]], float(scores[order[0]])
+                stall = 0
+            else:
+                stall += 1
+                step *= 0.7
+            trace.append(best_mismatch)
+            if stall >= patience:
+                stop_reason = "no_improvement"
+                break
+
+    fitted = {key: int(value) for key, value in zip(SLIDER_KEYS, best)}
+    tlist, happiness_A, happiness_B, _ = simulate_couple(build_simulation_args(fitted))
+    mismatch, res_A, res_B = trajectory_residuals(tlist, happiness_A, happiness_B, observed)
+    return {
+        "fitted_params": fitted,
+        "initial_mismatch": initial if np.isfinite(initial) else None,
+        "mismatch": mismatch,
+        "residuals": {
+            "positions": observed["positions"].tolist(),
+            "observed_A": observed["A"].tolist(),
+            "observed_B": observed["B"].tolist(),
+            "A": res_A.tolist(),
+            "B": res_B.tolist(),
+        },
+        "generations": generations,
+        "warm_start": best_start > 0,
+        "evaluations": len(seen),
+        "mismatch_trace": trace,
+        "stop_reason": stop_reason,
+        "fit_seconds": time.perf_counter() - started,
+    }
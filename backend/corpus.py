@@ -0,0 +1,113 @@
+"""
+Request corpus for the load harness: one JSON request per line.
+
+    {"method": "POST", "path": "/run", "json": {...}}
+    {"method": "POST", "path": "/analyze-run", "form": {...},
+     "files": [{"field": "files", "path": "corpus.files/<sha>.png", "filename": "a.png", "mimetype": "image/png"}]}
+
+File paths are relative to the corpus file. Set QUPID_RECORD_CORPUS to a .jsonl
+path to have the app append every POST it receives.
+"""
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import uuid
+
+RECORD_PATH = os.environ.get("QUPID_RECORD_CORPUS", "")
+
+_record_lock = asyncio.Lock()
+
+
+def _files_dir(corpus_path):
+    return os.path.splitext(corpus_path)[0] + ".files"
+
+
+async def record(request):
+    """
+    Appends the current request to RECORD_PATH. Uploaded files are stored
+    once by content hash next to the corpus.
+    """
+    entry = {"method": request.method, "path": request.path}
+    if request.is_json:
+        entry["json"] = await request.get_json(silent=True)
+    else:
+        form = await request.form
+        files = await request.files
+        entry["form"] = {key: form.get(key) for key in form.keys()}
+        stored = []
+        files_dir = _files_dir(RECORD_PATH)
+        for field in files.keys():
+            for upload in files.getlist(field):
+                data = upload.read()
+                upload.stream.seek(0)
+                ext = os.path.splitext(upload.filename or "")[1] or mimetypes.guess_extension(upload.mimetype or "") or ""
+                name = hashlib.sha256(data).hexdigest()[:24] + ext
+                os.makedirs(files_dir, exist_ok=True)
+                target = os.path.join(files_dir, name)
+                if not os.path.exists(target):
+                    with open(target, "wb") as fh:
+                        fh.write(data)
+                stored.append({
+                    "field": field,
+                    "path": os.path.join(os.path.basename(files_dir), name),
+                    "filename": upload.filename,
+                    "mimetype": upload.mimetype,
+                })
+        if stored:
+            entry["files"] = stored
+    async with _record_lock:
+        with open(RECORD_PATH, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry) + "\n")
+
+
+def load_corpus(path):
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            for item in entry.get("files") or []:
+                with open(os.path.join(base, item["path"]), "rb") as data:
+                    item["data"] = data.read()
+            entries.append(entry)
+    if not entries:
+        raise ValueError(f"corpus {path} is empty")
+    return entries
+
+
+def encode_multipart(form, files):
+    """
+    (body, content_type) for a multipart/form-data request; repeated fields
+    (several `files`) are kept, unlike dict-based encoders.
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in (form or {}).items():
+        if value is None:
+            continue
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    for item in files or []:
+        header = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{item["field"]}"; '
+            f'filename="{item.get("filename") or "upload"}"\r\n'
+            f'Content-Type: {item.get("mimetype") or "application/octet-stream"}\r\n\r\n'
+        )
+        parts.append(header.encode("utf-8") + item["data"] + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def request_body(entry):
+    """
+    (body bytes, content type) for a corpus entry.
+    """
+    if "json" in entry:
+        return json.dumps(entry["json"]).encode("utf-8"), "application/json"
+    return encode_multipart(entry.get("form"), entry.get("files"))
@@ -0,0 +1,122 @@
+import numpy as np
+
+from qupid_group_dynamics import IntegrationError
+from qupid_parallel import default_workers, make_executor
+from qupid_time_dependent_floquet import calculate_hybrid_score, simulate_couple
+from backend.simulation_args import SLIDER_FLOORS, SLIDER_KEYS, build_simulation_args
+
+DEFAULT_MEMBERS = 64
+MAX_MEMBERS = 256
+DEFAULT_SPREAD = 8.0  # one standard deviation, in slider points
+
+
+def _spread_vector(spread):
+    if isinstance(spread, dict):
+        return np.array([float(spread.get(key, DEFAULT_SPREAD)) for key in SLIDER_KEYS])
+    value = DEFAULT_SPREAD if spread is None else float(spread)
+    return np.full(len(SLIDER_KEYS), value)
+
+
+def sample_members(base, members, spread=None, seed=0):
+    """
+    K slider sets drawn around `base`. Member 0 is `base` itself. Samples are
+    rounded to whole slider points like the analyzer's output, which keeps
+    per-frequency drive caches warm across members.
+    """
+    center = np.array([float(base.get(key) or 0) for key in SLIDER_KEYS])
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((members, len(SLIDER_KEYS))) * _spread_vector(spread)
+    floors = np.array([SLIDER_FLOORS.get(key, 0) for key in SLIDER_KEYS])
+    samples = np.clip(np.rint(center + noise), floors, 100)
+    samples[0] = center
+    return samples
+
+
+def _simulate_members(rows):
+    """
+    One (tlist, A, B, score) per row, or None for a member with invalid
+    parameters or a failed integration. Anything else is a bug and propagates.
+    """
+    out = []
+    for row in rows:
+        try:
+            sim_args = build_simulation_args(dict(zip(SLIDER_KEYS, row)))
+            tlist, happiness_A, happiness_B, final_rho = simulate_couple(sim_args)
+            score = calculate_hybrid_score(tlist, happiness_A, happiness_B, final_rho)
+        except (ValueError, IntegrationError):
+            out.append(None)
+            continue
+        out.append((tlist, happiness_A, happiness_B, score))
+    return out
+
+
+def _variance_contributions(samples, scores):
+    """
+    First-order share of score variance per slider from a linear fit over the
+    ensemble (beta_i^2 var(x_i) / var(score)).
+    """
+    score_var = float(np.var(scores))
+    x_var = np.var(samples, axis=0)
+    active = np.flatnonzero(x_var > 0)
+    if score_var <= 0 or len(active) == 0 or len(scores) <= len(active) + 1:
+        return []
+    design = np.column_stack([np.ones(len(scores)), samples[:, active]])
+    beta = np.linalg.lstsq(design, scores, rcond=None)[0][1:]
+    shares = beta ** 2 * x_var[active] / score_var
+    ranked = sorted(zip(active, beta, shares), key=lambda item: item[2], reverse=True)
+    return [
+        {"param": SLIDER_KEYS[idx], "score_per_point": float(slope), "variance_share": float(share)}
+        for idx, slope, share in ranked
+    ]
+
+
+def run_ensemble(base, members=DEFAULT_MEMBERS, spread=None, seed=0, workers=None):
+    """
+    Runs K perturbed parameter sets around `base` (0-100 slider payload) as one
+    parallel batch and summarizes trajectory bands and the score distribution.
+    Members whose solve fails are dropped and counted; ValueError if the nominal
+    member itself fails.
+    """
+    members = int(min(max(2, members), MAX_MEMBERS))
+    samples = sample_members(base, members, spread, seed)
+
+    workers = workers or default_workers()
+    n_chunks = min(members, workers * 2)
+    chunks = [chunk.tolist() for chunk in np.array_split(samples, n_chunks)]
+    with make_executor(workers, thread_name_prefix="qupid-ensemble") as pool:
+        results = [member for chunk in pool.map(_simulate_members, chunks) for member in chunk]
+
+    if results[0] is None:
+        raise ValueError("the nominal parameters could not be simulated")
+    kept = [idx for idx, member in enumerate(results) if member is not None]
+    samples = samples[kept]
+    results = [results[idx] for idx in kept]
+
+    tlist = results[0][0]
+    traj_A = np.array([r[1] for r in results])
+    traj_B = np.array([r[2] for r in results])
+    scores = np.array([r[3] for r in results])
+
+    p10_A, p50_A, p90_A = np.percentile(traj_A, [10, 50, 90], axis=0)
+    p10_B, p50_B, p90_B = np.percentile(traj_B, [10, 50, 90], axis=0)
+    histogram, bin_edges = np.histogram(scores, bins=10, range=(0.0, 100.0))
+
+    return {
+        "members": len(results),
+        "failed_members": members - len(results),
+        "seed": seed,
+        "times": tlist.tolist(),
+        "happiness_A": {"p10": p10_A.tolist(), "median": p50_A.tolist(), "p90": p90_A.tolist()},
+        "happiness_B": {"p10": p10_B.tolist(), "median": p50_B.tolist(), "p90": p90_B.tolist()},
+        "health_score": {
+            "nominal": float(scores[0]),
+            "median": float(np.median(scores)),
+            "p10": float(np.percentile(scores, 10)),
+            "p90": float(np.percentile(scores, 90)),
+            "mean": float(np.mean(scores)),
+            "std": float(np.std(scores)),
+            "histogram": histogram.tolist(),
+            "bin_edges": bin_edges.tolist(),
+        },
+        "variance_drivers": _variance_contributions(samples, scores),
+    }
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import threading
+from functools import partial
+
+from qupid_parallel import make_executor
+from backend import memory_monitor, stage_timing
+
+SOLVER_WORKERS = max(1, int(os.environ.get("QUPID_SOLVER_WORKERS", "2")))
+# A process pool is replaced after this many tasks (0: never) or once its
+# children together exceed QUPID_MAX_SOLVER_RSS_MB (0: no limit), so memory
+# held by long-lived solver processes is returned to the system.
+SOLVER_MAX_TASKS = int(os.environ.get("QUPID_SOLVER_MAX_TASKS", "500"))
+SOLVER_MAX_RSS_MB = float(os.environ.get("QUPID_MAX_SOLVER_RSS_MB", "0"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = 0
+_pool_tasks = 0
+_pool_recycles = 0
+
+
+def solver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # A process pool under backend.serve (non-daemonic workers); a thread
+            # pool under daemonic servers, which cannot fork children.
+            _pool = make_executor(SOLVER_WORKERS, thread_name_prefix="qupid-solver")
+        return _pool
+
+
+def pool_pids():
+    """
+    PIDs of the solver pool's worker processes (none for a thread pool).
+    """
+    pool = _pool
+    return list(getattr(pool, "_processes", None) or ())
+
+
+def recycle_pool(reason):
+    """
+    Swaps in a fresh pool on next use. The old one finishes its queued tasks
+    and its processes exit.
+    """
+    global _pool, _pool_tasks, _pool_recycles
+    with _pool_lock:
+        pool, _pool = _pool, None
+        _pool_tasks = 0
+        _pool_recycles += 1
+    if pool is not None:
+        print(f"[qupid] worker {os.getpid()} replacing solver pool: {reason}")
+        pool.shutdown(wait=False)
+
+
+def pool_stats():
+    return {"processes": len(pool_pids()), "tasks": _pool_tasks, "recycles": _pool_recycles}
+
+
+def maybe_recycle_pool():
+    """
+    Called after each request; recycles a process pool past its task or RSS limit.
+    """
+    pids = pool_pids()
+    if not pids:
+        return
+    if SOLVER_MAX_TASKS > 0 and _pool_tasks >= SOLVER_MAX_TASKS:
+        recycle_pool(f"{_pool_tasks} tasks")
+    elif SOLVER_MAX_RSS_MB > 0:
+        rss = memory_monitor.children_rss_bytes(pids)
+        if rss > SOLVER_MAX_RSS_MB * 1024 * 1024:
+            recycle_pool(f"rss {rss / 2**20:.0f} MiB > {SOLVER_MAX_RSS_MB:.0f} MiB")
+
+
+async def run_solver(fn, *args, **kwargs):
+    """
+    Runs a CPU-bound callable on the solver pool without blocking the event loop.
+    """
+    global _in_flight, _pool_tasks
+    loop = asyncio.get_running_loop()
+    _in_flight += 1
+    _pool_tasks += 1
+    try:
+        with stage_timing.stage("solve"):
+            return await loop.run_in_executor(solver_pool(), partial(fn, *args, **kwargs))
+    finally:
+        _in_flight -= 1
+
+
+def in_flight():
+    return _in_flight
+
+
+def shutdown_pool(wait=True):
+    """
+    Stops accepting solver work and (by default) waits for queued jobs to finish.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
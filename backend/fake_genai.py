@@ -0,0 +1,134 @@
+"""
+Local stand-in for the parts of google.generativeai the backend uses, for load
+testing without network calls or quota. Enabled with QUPID_FAKE_GENAI=1.
+
+Latency is log-normal around QUPID_FAKE_GENAI_LATENCY_MS (spread set by
+QUPID_FAKE_GENAI_LATENCY_SIGMA). QUPID_FAKE_GENAI_FAILURES injects failures as
+comma-separated kind:probability pairs, e.g. "error:0.02,timeout:0.01,malformed:0.01".
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+
+LATENCY_MS = float(os.environ.get("QUPID_FAKE_GENAI_LATENCY_MS", "800"))
+LATENCY_SIGMA = float(os.environ.get("QUPID_FAKE_GENAI_LATENCY_SIGMA", "0.4"))
+TIMEOUT_S = float(os.environ.get("QUPID_FAKE_GENAI_TIMEOUT_S", "30"))
+FAILURE_KINDS = ("error", "timeout", "malformed")
+
+SLIDER_FIELDS = [
+    "mutualEmpathy",
+    "mutualCompatability",
+    "mutualFrequency",
+    "mutualStrength",
+    "mutualSync",
+    "mutualCodependence",
+    "personATemperarment",
+    "personAHotCold",
+    "personADistant",
+    "personABurnedOut",
+    "personBTemperarment",
+    "personBHotCold",
+    "personBDistant",
+    "personBBurnedOut",
+]
+
+_rng = random.Random(os.environ.get("QUPID_FAKE_GENAI_SEED"))
+
+
+def _failure_rates(spec):
+    rates = {}
+    for item in (spec or "").split(","):
+        kind, _, prob = item.strip().partition(":")
+        if kind in FAILURE_KINDS and prob:
+            rates[kind] = float(prob)
+    return rates
+
+
+FAILURE_RATES = _failure_rates(os.environ.get("QUPID_FAKE_GENAI_FAILURES", ""))
+
+
+class FakeModelError(RuntimeError):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def configure(api_key=None, **_):
+    pass
+
+
+def _draw():
+    """
+    (latency seconds, failure kind or None) for one call.
+    """
+    latency = LATENCY_MS / 1000.0 * math.exp(_rng.gauss(0.0, LATENCY_SIGMA))
+    roll = _rng.random()
+    for kind, prob in FAILURE_RATES.items():
+        if roll < prob:
+            return (TIMEOUT_S if kind == "timeout" else latency), kind
+        roll -= prob
+    return latency, None
+
+
+def _digest(contents):
+    h = hashlib.sha256()
+    for part in contents if isinstance(contents, list) else [contents]:
+        if isinstance(part, dict):
+            h.update(part.get("data") or b"")
+        else:
+            h.update(str(part).encode("utf-8"))
+    return h.digest()
+
+
+def _json_reply(contents):
+    # Deterministic per input, so identical requests get identical parameters.
+    rng = random.Random(_digest(contents))
+    data = {key: rng.randint(20, 80) for key in SLIDER_FIELDS}
+    data.update({
+        "personAName": "You",
+        "personBName": "Person B",
+        "conversationInsights": [
+            "Replies arrive in steady bursts.",
+            "Both partners mirror each other's tone.",
+            "Plans are made and mostly kept.",
+        ],
+    })
+    return json.dumps(data)
+
+
+def _text_reply(generation_config):
+    max_tokens = int((generation_config or {}).get("max_output_tokens") or 400)
+    sentence = "The trajectory settles into a steady rhythm after an early wobble. "
+    return (sentence * max(1, max_tokens // 14)).strip()
+
+
+def _reply(contents, generation_config, failure):
+    if failure in ("error", "timeout"):
+        raise FakeModelError(f"fake model: injected {failure}")
+    if failure == "malformed":
+        return FakeResponse("{not json")
+    if (generation_config or {}).get("response_mime_type") == "application/json":
+        return FakeResponse(_json_reply(contents))
+    return FakeResponse(_text_reply(generation_config))
+
+
+class GenerativeModel:
+    def __init__(self, model_name, **_):
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, **_):
+        latency, failure = _draw()
+        time.sleep(latency)
+        return _reply(contents, generation_config, failure)
+
+    async def generate_content_async(self, contents, generation_config=None, **_):
+        latency, failure = _draw()
+        await asyncio.sleep(latency)
+        return _reply(contents, generation_config, failure)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.simulation_args import SLIDER_KEYS
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "qupid_history.sqlite3")
+)
+# The fingerprint covers the opening of the chat, so appended messages keep it stable.
+FINGERPRINT_PREFIX = 20
+# Tails shorter than this are padded with earlier messages as context for inference.
+MIN_TAIL_CONTEXT = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    fingerprint TEXT PRIMARY KEY,
+    sender_a TEXT NOT NULL,
+    sender_b TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    fingerprint TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    text TEXT NOT NULL,
+    timestamp TEXT,
+    PRIMARY KEY (fingerprint, idx)
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    window_start INTEGER NOT NULL,
+    window_end INTEGER NOT NULL,
+    last_message_at TEXT,
+    inferred_params TEXT NOT NULL,
+    trajectory_metrics TEXT NOT NULL,
+    health_score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_by_fingerprint ON analyses (fingerprint, created_at);
+"""
+
+
+def message_digest(message):
+    timestamp = message.get("timestamp")
+    raw = "\x1f".join([
+        str(message.get("sender") or ""),
+        str(message.get("text") or ""),
+        timestamp.isoformat() if timestamp else "",
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _prefix_fingerprint(digests):
+    return hashlib.sha256("".join(digests).encode("ascii")).hexdigest()[:32]
+
+
+def conversation_fingerprint(messages):
+    return _prefix_fingerprint([message_digest(m) for m in messages[:FINGERPRINT_PREFIX]])
+
+
+def merge_params(previous, previous_count, tail, tail_count):
+    """
+    Message-count-weighted blend of the stored parameters and those inferred
+    from the new tail. Names and insights come from the newest inference.
+    """
+    if not previous:
+        return dict(tail)
+    total = max(1, previous_count + tail_count)
+    merged = dict(tail)
+    for key in SLIDER_KEYS:
+        prev_value = float(previous.get(key, tail.get(key, 50)))
+        tail_value = float(tail.get(key, prev_value))
+        merged[key] = int(round((prev_value * previous_count + tail_value * tail_count) / total))
+    return merged
+
+
+class HistoryStore:
+    """
+    SQLite store of analyses keyed by conversation fingerprint.
+    Connections are short-lived so the store is safe to use from worker threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("QUPID_HISTORY_DB", DEFAULT_DB_PATH)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def plan(self, messages):
+        """
+        Diffs an upload against the stored conversation. Returns the fingerprint,
+        the stored state (if any), the index where new messages start, and the
+        slice to send for inference (the new tail plus a little context).
+        """
+        digests = [message_digest(m) for m in messages]
+        # A conversation first stored with fewer than FINGERPRINT_PREFIX messages
+        # was fingerprinted on a shorter prefix, so try every prefix length.
+        candidates = [_prefix_fingerprint(digests[:m]) for m in range(min(FINGERPRINT_PREFIX, len(digests)), 0, -1)]
+        with self._connect() as conn:
+            found = dict(
+                (row[0], row[1:])
+                for row in conn.execute(
+                    "SELECT fingerprint, sender_a, sender_b, message_count FROM conversations "
+                    f"WHERE fingerprint IN ({','.join('?' * len(candidates))})",
+                    candidates,
+                )
+            ) if candidates else {}
+            fingerprint = next((fp for fp in candidates if fp in found), None)
+            convo = found.get(fingerprint)
+            fingerprint = fingerprint or conversation_fingerprint(messages)
+            stored = [row[0] for row in conn.execute(
+                "SELECT digest FROM messages WHERE fingerprint = ? ORDER BY idx", (fingerprint,)
+            )]
+            latest = self._latest(conn, fingerprint)
+
+        common = 0
+        for old, new in zip(stored, digests):
+            if old != new:
+                break
+            common += 1
+        # Edited or truncated history invalidates the stored analysis.
+        diverged = convo is not None and common < len(stored)
+        start = 0 if diverged or convo is None else common
+        context_start = max(0, min(start, len(messages) - MIN_TAIL_CONTEXT))
+
+        return {
+            "fingerprint": fingerprint,
+            "senders": (convo[0], convo[1]) if convo else None,
+            "previous": None if diverged else latest,
+            "previous_count": 0 if diverged or convo is None else common,
+            "new_start": start,
+            "inference_window": messages[context_start:],
+            "unchanged": convo is not None and not diverged and start == len(messages) and latest is not None,
+        }
+
+    def _latest(self, conn, fingerprint):
+        row = conn.execute(
+            "SELECT inferred_params, trajectory_metrics, health_score, created_at FROM analyses "
+            "WHERE fingerprint = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "inferred_params": json.loads(row[0]),
+            "trajectory_metrics": json.loads(row[1]),
+            "health_score": row[2],
+            "created_at": row[3],
+        }
+
+    def record(self, fingerprint, messages, senders, new_start, inferred_params, trajectory_metrics, health_score):
+        now = time.time()
+        last_ts = next((m["timestamp"] for m in reversed(messages) if m.get("timestamp")), None)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO conversations (fingerprint, sender_a, sender_b, message_count, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(fingerprint) DO UPDATE SET "
+                "message_count = excluded.message_count, updated_at = excluded.updated_at",
+                (fingerprint, senders[0], senders[1], len(messages), now, now),
+            )
+            conn.execute("DELETE FROM messages WHERE fingerprint = ? AND idx >= ?", (fingerprint, new_start))
+            conn.executemany(
+                "INSERT INTO messages (fingerprint, idx, digest, sender, text, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        fingerprint,
+                        idx,
+                        message_digest(m),
+                        str(m.get("sender") or ""),
+                        str(m.get("text") or ""),
+                        m["timestamp"].isoformat() if m.get("timestamp") else None,
+                    )
+                    for idx, m in enumerate(messages[new_start:], start=new_start)
+                ],
+            )
+            conn.execute(
+                "INSERT INTO analyses (fingerprint, created_at, window_start, window_end, last_message_at, "
+                "inferred_params, trajectory_metrics, health_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint,
+                    now,
+                    new_start,
+                    len(messages),
+                    last_ts.isoformat() if last_ts else None,
+                    json.dumps(inferred_params),
+                    json.dumps(trajectory_metrics),
+                    float(health_score),
+                ),
+            )
+
+    def history(self, fingerprint):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT created_at, window_start, window_end, last_message_at, health_score, trajectory_metrics "
+                "FROM analyses WHERE fingerprint = ? ORDER BY created_at, id",
+                (fingerprint,),
+            ).fetchall()
+        return [
+            {
+                "created_at": row[0],
+                "window_start": row[1],
+                "window_end": row[2],
+                "last_message_at": row[3],
+                "health_score": row[4],
+                "trajectory_metrics": json.loads(row[5]),
+            }
+            for row in rows
+        ]
+
+
+store = HistoryStore()
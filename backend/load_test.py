@@ -0,0 +1,297 @@
+"""
+Replays a request corpus (see backend/corpus.py) against the app and reports
+throughput, error rates, latency percentiles and per-stage breakdowns taken
+from the Server-Timing header.
+
+    python -m backend.load_test corpus.jsonl --concurrency 8 --rate 4 --out run.json
+    python -m backend.load_test corpus.jsonl --baseline run.json
+
+By default the app runs in-process with model calls routed to the local fake
+(backend/fake_genai.py). Use --url to target a running server instead; start
+that server with QUPID_FAKE_GENAI=1 for the same effect.
+
+Simulated clients are told apart by X-Forwarded-For, as if behind one proxy.
+The in-process app is set to trust that hop; a --url server needs
+QUPID_TRUSTED_PROXY_HOPS=1, or every request shares one token bucket.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from backend.corpus import load_corpus, request_body
+from backend.stage_timing import parse_server_timing
+
+DIFF_METRICS = ["throughput_rps", "error_rate", "p50_ms", "p95_ms", "p99_ms"]
+
+
+def _summarize(samples, elapsed):
+    latencies = np.array([s["latency"] for s in samples]) * 1000.0
+    statuses = defaultdict(int)
+    stages = defaultdict(list)
+    errors = 0
+    for sample in samples:
+        statuses[str(sample["status"])] += 1
+        errors += sample["status"] == 0 or sample["status"] >= 400
+        for name, seconds in sample["stages"].items():
+            stages[name].append(seconds * 1000.0)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "errors": int(errors),
+        "error_rate": errors / len(samples),
+        "status": dict(statuses),
+        "throughput_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max()),
+        "stages_ms": {
+            name: {
+                "mean": float(np.mean(values)),
+                "p95": float(np.percentile(values, 95)),
+                "share": float(np.sum(values) / max(1e-9, latencies.sum())),
+            }
+            for name, values in sorted(stages.items())
+        },
+    }
+
+
+def summarize(samples, elapsed, config):
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample["path"]].append(sample)
+    return {
+        "config": config,
+        "elapsed_s": elapsed,
+        "overall": _summarize(samples, elapsed),
+        "routes": {path: _summarize(group, elapsed) for path, group in sorted(by_route.items())},
+    }
+
+
+def diff_reports(baseline, current):
+    """
+    Per-route (and overall) change in throughput, error rate and latency
+    percentiles relative to a previous report.
+    """
+    pairs = [("overall", baseline.get("overall"), current.get("overall"))]
+    for path, stats in current.get("routes", {}).items():
+        pairs.append((path, baseline.get("routes", {}).get(path), stats))
+    out = {}
+    for name, old, new in pairs:
+        if not old or not new:
+            continue
+        out[name] = {
+            metric: {
+                "baseline": old[metric],
+                "current": new[metric],
+                "delta": new[metric] - old[metric],
+                "pct": (new[metric] - old[metric]) / old[metric] * 100.0 if old[metric] else None,
+            }
+            for metric in DIFF_METRICS
+        }
+    return out
+
+
+def print_report(report, diff=None):
+    print(f"{'route':<22}{'n':>6}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}  stages (mean ms)")
+    rows = [("overall", report["overall"])] + list(report["routes"].items())
+    for name, stats in rows:
+        stages = " ".join(f"{k}={v['mean']:.0f}" for k, v in stats["stages_ms"].items())
+        print(
+            f"{name:<22}{stats['count']:>6}{stats['error_rate'] * 100:>7.1f}{stats['throughput_rps']:>8.2f}"
+            f"{stats['p50_ms']:>9.0f}{stats['p95_ms']:>9.0f}{stats['p99_ms']:>9.0f}  {stages}"
+        )
+    if diff:
+        print("\nvs baseline")
+        for name, metrics in diff.items():
+            changes = " ".join(
+                f"{metric}={m['delta']:+.2f}" + (f" ({m['pct']:+.0f}%)" if m["pct"] is not None else "")
+                for metric, m in metrics.items()
+            )
+            print(f"  {name:<20}{changes}")
+
+
+class InProcessTarget:
+    def __init__(self):
+        from backend import admission
+        from backend.app import app
+
+        # The harness is the one proxy in front, tagging each simulated client.
+        admission.TRUSTED_PROXY_HOPS = 1
+        self.app = app
+        self._test_app = None
+
+    async def __aenter__(self):
+        self._test_app = self.app.test_app()
+        await self._test_app.__aenter__()
+        self.client = self._test_app.test_client()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._test_app.__aexit__(*exc)
+
+    async def send(self, method, path, body, content_type, client_id):
+        response = await self.client.open(
+            path,
+            method=method,
+            data=body,
+            headers={"Content-Type": content_type, "X-Forwarded-For": client_id},
+        )
+        await response.get_data()
+        return response.status_code, response.headers.get("Server-Timing")
+
+
+class HttpTarget:
+    def __init__(self, url, concurrency):
+        self.url = url.rstrip("/")
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="qupid-load")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.shutdown(wait=False)
+
+    def _send(self, method, path, body, content_type, client_id):
+        req = urllib.request.Request(
+            self.url + path,
+            data=body,
+            method=method,
+            headers={"Content-Type": content_type, "X-Forwarded-For": client_id},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=300) as resp:
+                resp.read()
+                return resp.status, resp.headers.get("Server-Timing")
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, exc.headers.get("Server-Timing")
+
+    async def send(self, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self._send, *args)
+
+
+async def replay(target, corpus, total, concurrency, rate, clients, seed=0):
+    """
+    Sends `total` requests cycling through the corpus. With rate > 0 arrivals
+    are Poisson (open loop) and latency includes time queued behind the
+    concurrency limit; otherwise `concurrency` workers send back to back.
+    """
+    rng = random.Random(seed)
+    prepared = [(entry.get("method", "POST"), entry["path"], *request_body(entry)) for entry in corpus]
+    samples = []
+    limit = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def one(i, scheduled):
+        method, path, body, content_type = prepared[i % len(prepared)]
+        async with limit:
+            sent = time.perf_counter()
+            try:
+                status, timing = await target.send(method, path, body, content_type, f"load-{i % clients}")
+            except Exception:
+                status, timing = 0, None
+            done = time.perf_counter()
+        samples.append({
+            "path": path,
+            "status": status,
+            "latency": done - (scheduled if rate > 0 else sent),
+            "stages": parse_server_timing(timing),
+        })
+
+    tasks = []
+    if rate > 0:
+        arrival = start
+        for i in range(total):
+            arrival += rng.expovariate(rate)
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(i, arrival)))
+    else:
+        tasks = [asyncio.ensure_future(one(i, None)) for i in range(total)]
+    await asyncio.gather(*tasks)
+    return samples, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--url", help="target a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=0, help="total requests (default: one pass over the corpus)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second; 0 = closed loop")
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=0,
+        help="distinct client ids for admission (default: concurrency; a --url server "
+        "needs QUPID_TRUSTED_PROXY_HOPS=1 to tell them apart)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake-latency-ms", type=float, default=800.0)
+    parser.add_argument("--fake-latency-sigma", type=float, default=0.4)
+    parser.add_argument("--fake-failures", default="", help='e.g. "error:0.02,timeout:0.01,malformed:0.01"')
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="previous JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        # Must be set before the app (and the analyzer modules) are imported.
+        os.environ["QUPID_FAKE_GENAI"] = "1"
+        os.environ["QUPID_FAKE_GENAI_LATENCY_MS"] = str(args.fake_latency_ms)
+        os.environ["QUPID_FAKE_GENAI_LATENCY_SIGMA"] = str(args.fake_latency_sigma)
+        os.environ["QUPID_FAKE_GENAI_FAILURES"] = args.fake_failures
+        os.environ.setdefault("QUPID_FAKE_GENAI_SEED", str(args.seed))
+        os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+    corpus = load_corpus(args.corpus)
+    total = args.requests or len(corpus)
+    clients = args.clients or args.concurrency
+    config = {
+        "corpus": os.path.abspath(args.corpus),
+        "target": args.url or "in-process",
+        "requests": total,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "clients": clients,
+        "fake_latency_ms": None if args.url else args.fake_latency_ms,
+        "fake_latency_sigma": None if args.url else args.fake_latency_sigma,
+        "fake_failures": None if args.url else args.fake_failures,
+    }
+
+    async def run():
+        target = HttpTarget(args.url, args.concurrency) if args.url else InProcessTarget()
+        async with target:
+            return await replay(target, corpus, total, args.concurrency, args.rate, clients, args.seed)
+
+    samples, elapsed = asyncio.run(run())
+    report = summarize(samples, elapsed, config)
+    diff = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            diff = diff_reports(json.load(fh), report)
+        report["diff"] = diff
+    print_report(report, diff)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
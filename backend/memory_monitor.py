@@ -0,0 +1,161 @@
+import os
+import random
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict
+
+MAX_RSS_MB = float(os.environ.get("QUPID_MAX_RSS_MB", "0"))  # 0 disables recycling
+TRACEMALLOC_ENABLED = os.environ.get("QUPID_TRACEMALLOC") == "1"
+TRACEMALLOC_FRAMES = int(os.environ.get("QUPID_TRACEMALLOC_FRAMES", "1"))
+SAMPLE_RATE = float(os.environ.get("QUPID_TRACEMALLOC_SAMPLE_RATE", "0.05"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_sample_lock = threading.Lock()
+_sampling = False
+_request_peaks = defaultdict(
+    lambda: {"samples": 0, "discarded": 0, "max_peak_bytes": 0, "last_peak_bytes": 0, "last_children_rss_bytes": 0}
+)
+_active_requests = 0
+_overlapped = False
+_recycle_callback = None
+_recycling = False
+
+if TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+def rss_bytes(pid="self"):
+    """
+    Current resident set size of this process (or `pid`); for this process it
+    falls back to the peak RSS off Linux, for others to 0.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return max_rss_bytes() if pid == "self" else 0
+
+
+def children_rss_bytes(pids):
+    """
+    Summed RSS of child processes (e.g. the solver pool's workers).
+    """
+    return sum(rss_bytes(pid) for pid in pids)
+
+
+def max_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def begin_request_sample():
+    """
+    Called for every request. Starts a tracemalloc peak window for a sampled
+    fraction of requests that arrive while the worker is otherwise idle; only
+    one window is open at a time, since tracemalloc's peak is process-wide.
+    """
+    global _sampling, _active_requests, _overlapped
+    with _sample_lock:
+        _active_requests += 1
+        if _sampling:
+            _overlapped = True
+        if (
+            _sampling
+            or _active_requests > 1
+            or not tracemalloc.is_tracing()
+            or random.random() >= SAMPLE_RATE
+        ):
+            return False
+        _sampling = True
+        _overlapped = False
+    tracemalloc.reset_peak()
+    return True
+
+
+def end_request_sample(route, sampled, child_pids=()):
+    """
+    Called for every request. A sampled window that another request overlapped
+    is discarded, since that request's allocations are in the peak too. Solver
+    pool children are outside tracemalloc, so their RSS is recorded alongside.
+    """
+    global _sampling, _active_requests
+    with _sample_lock:
+        _active_requests = max(0, _active_requests - 1)
+        if not sampled:
+            return
+        _sampling = False
+        overlapped = _overlapped
+    stats = _request_peaks[route]
+    if overlapped:
+        stats["discarded"] += 1
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    stats["samples"] += 1
+    stats["last_peak_bytes"] = peak
+    stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak)
+    stats["last_children_rss_bytes"] = children_rss_bytes(child_pids)
+
+
+def top_allocations(limit=20):
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [
+        {
+            "site": str(stat.traceback[0]) if stat.traceback else "?",
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def set_recycle_callback(callback):
+    """
+    Registered by the serving process; called once when RSS crosses the ceiling.
+    """
+    global _recycle_callback
+    _recycle_callback = callback
+
+
+def check_rss(child_pids=()):
+    """
+    Called after each request. Asks the worker to recycle (finish in-flight work,
+    exit, be replaced) once its RSS plus that of its solver pool children
+    exceeds QUPID_MAX_RSS_MB.
+    """
+    global _recycling
+    if MAX_RSS_MB <= 0 or _recycling:
+        return
+    rss = rss_bytes() + children_rss_bytes(child_pids)
+    if rss > MAX_RSS_MB * 1024 * 1024:
+        _recycling = True
+        print(f"[qupid] worker {os.getpid()} rss {rss / 2**20:.0f} MiB > {MAX_RSS_MB:.0f} MiB, recycling")
+        if _recycle_callback is not None:
+            _recycle_callback()
+
+
+def stats(limit=20, child_pids=()):
+    traced_current, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "children_rss_bytes": {str(pid): rss_bytes(pid) for pid in child_pids},
+        "max_rss_bytes": max_rss_bytes(),
+        "rss_limit_bytes": int(MAX_RSS_MB * 1024 * 1024) if MAX_RSS_MB > 0 else None,
+        "recycling": _recycling,
+        "tracemalloc": {
+            "enabled": tracemalloc.is_tracing(),
+            "sample_rate": SAMPLE_RATE,
+            "current_bytes": traced_current,
+            "peak_bytes": traced_peak,
+        },
+        "request_peaks": dict(_request_peaks),
+        "top_allocations": top_allocations(limit),
+    }
@@ -7,7 +7,12 @@ import re
 from collections import defaultdict
 from datetime import datetime
 
-import google.generativeai as genai
+if os.environ.get("QUPID_FAKE_GENAI") == "1":
+    from backend import fake_genai as genai
+else:
+    import google.generativeai as genai
+
+from backend import stage_timing
 
 POSITIVE_WORDS = {
     "love", "great", "good", "amazing", "happy", "glad", "excited", "thanks", "thank",
@@ -250,11 +255,11 @@ def _load_gemini_api_key() -> str:
     return api_key
 
 
-def infer_parameters(messages):
+def _messages_request(messages, senders=None):
     if not messages:
         raise ValueError("No valid messages found in the uploaded file.")
 
-    sender_a, sender_b = _most_common_senders(messages)
+    sender_a, sender_b = senders or _most_common_senders(messages)
     formatted_messages = _format_messages_for_prompt(messages)
     if not formatted_messages:
         raise ValueError("No message content available for analysis.")
@@ -296,14 +301,14 @@ Conversation:
 {formatted_messages}
 """.strip()
 
-    response = model.generate_content(
-        f"{system_prompt}\n\n{user_prompt}",
-        generation_config={
-            "response_mime_type": "application/json",
-            "max_output_tokens": 800,
-        },
-    )
+    generation_config = {
+        "response_mime_type": "application/json",
+        "max_output_tokens": 800,
+    }
+    return model, model_name, f"{system_prompt}\n\n{user_prompt}", generation_config, formatted_messages
 
+
+def _inferred_from_messages_response(response, model_name, messages, formatted_messages):
     raw_text = getattr(response, "text", "") or ""
 
     data = _parse_model_json(raw_text)
@@ -365,7 +370,20 @@ Conversation:
     return inferred, debug
 
 
-def infer_parameters_from_images(files):
+def infer_parameters(messages, senders=None):
+    model, model_name, prompt, generation_config, formatted_messages = _messages_request(messages, senders)
+    response = model.generate_content(prompt, generation_config=generation_config)
+    return _inferred_from_messages_response(response, model_name, messages, formatted_messages)
+
+
+async def infer_parameters_async(messages, senders=None):
+    model, model_name, prompt, generation_config, formatted_messages = _messages_request(messages, senders)
+    with stage_timing.stage("analyzer"):
+        response = await model.generate_content_async(prompt, generation_config=generation_config)
+    return _inferred_from_messages_response(response, model_name, messages, formatted_messages)
+
+
+def _image_request(files):
     if not files:
         raise ValueError("No screenshots provided.")
     if len(files) > 10:
@@ -419,14 +437,14 @@ Return ONLY valid JSON. No commentary.
         mime_type = file_storage.mimetype or "image/png"
         contents.append({"mime_type": mime_type, "data": data})
 
-    response = model.generate_content(
-        contents,
-        generation_config={
-            "response_mime_type": "application/json",
-            "max_output_tokens": 900,
-        },
-    )
+    generation_config = {
+        "response_mime_type": "application/json",
+        "max_output_tokens": 900,
+    }
+    return model, model_name, contents, generation_config
 
+
+def _inferred_from_image_response(response, model_name, files):
     raw_text = getattr(response, "text", "") or ""
     data = _parse_model_json(raw_text)
 
@@ -484,3 +502,16 @@ Return ONLY valid JSON. No commentary.
     }
 
     return inferred, debug
+
+
+def infer_parameters_from_images(files):
+    model, model_name, contents, generation_config = _image_request(files)
+    response = model.generate_content(contents, generation_config=generation_config)
+    return _inferred_from_image_response(response, model_name, files)
+
+
+async def infer_parameters_from_images_async(files):
+    model, model_name, contents, generation_config = _image_request(files)
+    with stage_timing.stage("analyzer"):
+        response = await model.generate_content_async(contents, generation_config=generation_config)
+    return _inferred_from_image_response(response, model_name, files)
@@ -1,7 +1,12 @@
 import base64
 import os
 
-import google.generativeai as genai
+if os.environ.get("QUPID_FAKE_GENAI") == "1":
+    from backend import fake_genai as genai
+else:
+    import google.generativeai as genai
+
+from backend import stage_timing
 
 
 def _load_gemini_api_key() -> str:
@@ -29,9 +34,7 @@ def _strip_asterisks(text):
     return text.replace("**", "").replace("*", "")
 
 
-def generate_gemini_report(plot_b64, trajectory_metrics, inferred_params, conversation_insights):
-    model = _build_model()
-
+def _report_request(plot_b64, trajectory_metrics, inferred_params, conversation_insights, levers=None):
     system_prompt = (
         "You are writing a long, detailed relationship trajectory report. "
         "Use simple English language/vocabularly in a conversational, astrologer tone but mix real scientific quantum terminology"
@@ -49,13 +52,18 @@ def generate_gemini_report(plot_b64, trajectory_metrics, inferred_params, conver
     metrics = trajectory_metrics or {}
     insights = conversation_insights or []
     params = inferred_params or {}
+    lever_lines = ""
+    if levers:
+        lever_lines = (
+            f"- Computed levers (inferred parameters that move the health score most, strongest first): {levers}\n"
+        )
 
     user_prompt = f"""
 Write a detailed report based on:
 - Trajectory metrics: {metrics}
 - Inferred parameters (0-100): {params}
 - Conversation insights (bullets): {insights}
-
+{lever_lines}
 Structure with these headings, in order (all-caps, single line):
 OUTLOOK
 NEAR TERM (next 2-4 weeks)
@@ -67,6 +75,7 @@ INTERVENTIONS
 Each section should be 2-4 sentences. Keep it predictive, time-based, and grounded in the simulated trajectory.
 Use a few quantum terms inside the human analysis. Do not summarize the conversation. Instead, weave in
 specific details from the conversation insights as evidence in each section. Make it consistent with the plot.
+If computed levers are given, base INTERVENTIONS on the top ones, in plain words and in the stated direction.
 """.strip()
 
     contents = [
@@ -80,19 +89,10 @@ specific details from the conversation insights as evidence in each section. Mak
         except Exception:
             pass
 
-    response = model.generate_content(
-        contents,
-        generation_config={
-            "max_output_tokens": 1200,
-        },
-    )
-
-    raw_text = _extract_text(response)
-    return _strip_asterisks(raw_text)
+    return contents, {"max_output_tokens": 1200}
 
 
-def generate_gemini_caption(plot_b64, trajectory_metrics, inferred_params):
-    model = _build_model()
+def _caption_request(plot_b64, trajectory_metrics, inferred_params):
     metrics = trajectory_metrics or {}
     params = inferred_params or {}
 
@@ -113,12 +113,38 @@ Inferred parameters (0-100): {params}
         except Exception:
             pass
 
-    response = model.generate_content(
-        contents,
-        generation_config={
-            "max_output_tokens": 120,
-        },
+    return contents, {"max_output_tokens": 120}
+
+
+def generate_gemini_report(plot_b64, trajectory_metrics, inferred_params, conversation_insights, levers=None):
+    model = _build_model()
+    contents, generation_config = _report_request(
+        plot_b64, trajectory_metrics, inferred_params, conversation_insights, levers
     )
+    response = model.generate_content(contents, generation_config=generation_config)
+    return _strip_asterisks(_extract_text(response))
 
-    raw_text = _extract_text(response)
-    return _strip_asterisks(raw_text).strip()
+
+async def generate_gemini_report_async(plot_b64, trajectory_metrics, inferred_params, conversation_insights, levers=None):
+    model = _build_model()
+    contents, generation_config = _report_request(
+        plot_b64, trajectory_metrics, inferred_params, conversation_insights, levers
+    )
+    with stage_timing.stage("report"):
+        response = await model.generate_content_async(contents, generation_config=generation_config)
+    return _strip_asterisks(_extract_text(response))
+
+
+def generate_gemini_caption(plot_b64, trajectory_metrics, inferred_params):
+    model = _build_model()
+    contents, generation_config = _caption_request(plot_b64, trajectory_metrics, inferred_params)
+    response = model.generate_content(contents, generation_config=generation_config)
+    return _strip_asterisks(_extract_text(response)).strip()
+
+
+async def generate_gemini_caption_async(plot_b64, trajectory_metrics, inferred_params):
+    model = _build_model()
+    contents, generation_config = _caption_request(plot_b64, trajectory_metrics, inferred_params)
+    with stage_timing.stage("caption"):
+        response = await model.generate_content_async(contents, generation_config=generation_config)
+    return _strip_asterisks(_extract_text(response)).strip()
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from backend.simulation_args import SLIDER_KEYS, to_unit
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "qupid_runs.sqlite3")
+)
+DEFAULT_NEIGHBORS = 5
+# New runs are searched by brute force until they outgrow this share of the
+# tree (and REBUILD_MIN rows); then the tree is rebuilt over everything.
+REBUILD_FRACTION = 0.1
+REBUILD_MIN = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    param_key TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    params TEXT NOT NULL,
+    health_score REAL NOT NULL,
+    trajectory_metrics TEXT NOT NULL,
+    trajectory TEXT
+);
+"""
+
+
+def param_vector(params):
+    """
+    The 14 sliders scaled onto [0, 1], in SLIDER_KEYS order.
+    """
+    return np.array([min(max(to_unit(params.get(key)), 0.0), 1.0) for key in SLIDER_KEYS])
+
+
+def indexable(sim_args):
+    """
+    Only fresh runs of the default model are comparable by slider position alone.
+    """
+    return not any(sim_args.get(key) for key in ("noise", "noise_channels", "drive_envelope", "checkpoint"))
+
+
+def interpolate(neighbors):
+    """
+    Inverse-distance-weighted score and metrics of neighbors() rows; an exact
+    match is returned as is. None for no rows.
+    """
+    if not neighbors:
+        return None
+    exact = [n for n in neighbors if n["distance"] == 0.0]
+    if exact:
+        neighbors = exact[:1]
+    weights = np.array([1.0 / max(n["distance"], 1e-9) for n in neighbors])
+    weights /= weights.sum()
+    metric_keys = set.intersection(*(set(n["trajectory_metrics"]) for n in neighbors))
+    return {
+        "health_score": float(sum(w * n["health_score"] for w, n in zip(weights, neighbors))),
+        "trajectory_metrics": {
+            key: float(sum(w * n["trajectory_metrics"][key] for w, n in zip(weights, neighbors)))
+            for key in sorted(metric_keys)
+        },
+        "nearest_distance": neighbors[0]["distance"],
+        "neighbors": len(neighbors),
+    }
+
+
+class RunIndex:
+    """
+    Persistent nearest-neighbour index of completed runs over their normalized
+    slider vectors. Rows live in SQLite; each process keeps a KD-tree over them
+    plus a small brute-force buffer of rows added since the last rebuild, and
+    picks up rows written by other workers on its next query.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("QUPID_RUN_INDEX_DB", DEFAULT_DB_PATH)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._tree = None
+        self._tree_ids = np.zeros(0, dtype=int)
+        self._tree_scores = np.zeros(0)
+        self._recent_ids = []
+        self._recent_points = []
+        self._recent_scores = []
+        self._last_id = 0
+        self.rebuilds = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, params, health_score, trajectory_metrics, trajectory=None):
+        """
+        Adds a completed run. A slider vector already in the index is kept as is.
+        """
+        vector = param_vector(params)
+        sliders = {key: round(float(value) * 100.0, 3) for key, value in zip(SLIDER_KEYS, vector)}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (param_key, created_at, params, health_score, trajectory_metrics, trajectory) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    json.dumps(list(sliders.values())),
+                    time.time(),
+                    json.dumps(sliders),
+                    float(health_score),
+                    json.dumps(trajectory_metrics),
+                    json.dumps(trajectory) if trajectory is not None else None,
+                ),
+            )
+            self._sync(conn)
+
+    def _sync(self, conn):
+        rows = conn.execute(
+            "SELECT id, params, health_score FROM runs WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        with self._lock:
+            for run_id, params, score in rows:
+                if run_id <= self._last_id:
+                    continue
+                self._recent_ids.append(run_id)
+                self._recent_points.append(param_vector(json.loads(params)))
+                self._recent_scores.append(score)
+                self._last_id = run_id
+            if len(self._recent_ids) > max(REBUILD_MIN, REBUILD_FRACTION * len(self._tree_ids)):
+                self._rebuild()
+
+    def _rebuild(self):
+        points = np.vstack(([self._tree.data] if self._tree is not None else []) + [np.array(self._recent_points)])
+        self._tree = cKDTree(points)
+        self._tree_ids = np.concatenate([self._tree_ids, self._recent_ids]).astype(int)
+        self._tree_scores = np.concatenate([self._tree_scores, self._recent_scores])
+        self._recent_ids, self._recent_points, self._recent_scores = [], [], []
+        self.rebuilds += 1
+
+    def _search(self, vector, k):
+        # (distance, id, health_score) of the k nearest rows, tree and buffer merged.
+        found = []
+        with self._lock:
+            if self._tree is not None and k > 0:
+                distances, positions = self._tree.query(vector, k=min(k, len(self._tree_ids)))
+                for distance, position in zip(np.atleast_1d(distances), np.atleast_1d(positions)):
+                    found.append((float(distance), int(self._tree_ids[position]), float(self._tree_scores[position])))
+            if self._recent_points:
+                distances = np.linalg.norm(np.array(self._recent_points) - vector, axis=1)
+                for position in np.argsort(distances)[:k]:
+                    found.append((float(distances[position]), self._recent_ids[position], self._recent_scores[position]))
+        return sorted(found)[:k]
+
+    def neighbors(self, params, k=DEFAULT_NEIGHBORS):
+        """
+        The k stored runs nearest to `params` (0-100 sliders), closest first,
+        with their scores, metrics and downsampled trajectories.
+        """
+        with self._connect() as conn:
+            self._sync(conn)
+            hits = self._search(param_vector(params), int(k))
+            if not hits:
+                return []
+            ids = [run_id for _, run_id, _ in hits]
+            rows = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    "SELECT id, params, health_score, trajectory_metrics, trajectory FROM runs "
+                    f"WHERE id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+            }
+        return [
+            {
+                "distance": distance,
+                "params": json.loads(rows[run_id][0]),
+                "health_score": rows[run_id][1],
+                "trajectory_metrics": json.loads(rows[run_id][2]),
+                "trajectory": json.loads(rows[run_id][3]) if rows[run_id][3] else None,
+            }
+            for distance, run_id, _ in hits
+            if run_id in rows
+        ]
+
+    def estimate(self, params, k=DEFAULT_NEIGHBORS):
+        """
+        An instant approximate answer for `params` while the exact solve runs
+        (see interpolate). None when the index is empty.
+        """
+        return interpolate(self.neighbors(params, k))
+
+    def warm_starts(self, params, k=3):
+        """
+        Slider dicts of the nearest stored runs, as starting points for a search.
+        """
+        return [n["params"] for n in self.neighbors(params, k)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._tree_ids) + len(self._recent_ids),
+                "tree_size": len(self._tree_ids),
+                "pending": len(self._recent_ids),
+                "rebuilds": self.rebuilds,
+            }
+
+
+index = RunIndex()
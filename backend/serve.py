@@ -0,0 +1,102 @@
+"""
+Production launcher: a small supervisor that runs the ASGI app in several
+hypercorn worker processes sharing one listening socket. Workers shut down
+gracefully on SIGTERM or when they ask to recycle (see memory_monitor), and
+the supervisor replaces any worker that exits while it is still running.
+
+    python -m backend.serve
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", "2")))
+GRACEFUL_TIMEOUT = float(os.environ.get("QUPID_GRACEFUL_TIMEOUT", "60"))
+RESPAWN_BACKOFF = 1.0
+
+
+def _listen_socket(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(fd):
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    from backend import memory_monitor
+    from backend.app import app
+
+    config = Config()
+    config.bind = [f"fd://{fd}"]
+    config.graceful_timeout = GRACEFUL_TIMEOUT
+    config.accesslog = "-"
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        memory_monitor.set_recycle_callback(lambda: loop.call_soon_threadsafe(stop.set))
+        await serve(app, config, shutdown_trigger=stop.wait)
+
+    asyncio.run(main())
+
+
+def main():
+    port = int(os.environ.get("PORT", 5000))
+    sock = _listen_socket(port)
+    ctx = multiprocessing.get_context("fork")
+    workers = {}
+    stopping = False
+
+    def spawn():
+        # Non-daemonic, so workers may run their own solver process pools.
+        process = ctx.Process(target=_worker, args=(sock.fileno(),), name="qupid-worker")
+        process.start()
+        workers[process.pid] = process
+        print(f"[qupid] worker {process.pid} started")
+
+    def shutdown(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for process in workers.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for _ in range(WORKERS):
+        spawn()
+
+    print(f"[qupid] serving on 0.0.0.0:{port} with {WORKERS} workers")
+    while workers:
+        for pid, process in list(workers.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del workers[pid]
+            print(f"[qupid] worker {pid} exited with code {process.exitcode}")
+            if not stopping:
+                time.sleep(RESPAWN_BACKOFF)
+                spawn()
+        time.sleep(0.5)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+
+# The 14 slider inputs (0-100) that build_simulation_args maps onto the model.
+SLIDER_KEYS = [
+    "personATemperarment",
+    "personBTemperarment",
+    "mutualEmpathy",
+    "mutualCompatability",
+    "mutualStrength",
+    "mutualFrequency",
+    "personAHotCold",
+    "personADistant",
+    "personABurnedOut",
+    "personBHotCold",
+    "personBDistant",
+    "personBBurnedOut",
+    "mutualSync",
+    "mutualCodependence",
+]
+
+# Smallest value a slider search may sample: a zero frequency has no drive period.
+SLIDER_FLOORS = {"mutualFrequency": 1}
+
+# Largest group /run-group solves synchronously. Every backend's cost grows steeply
+# with the 2^n Hilbert space: a cold 6-partner Floquet-Markov solve takes about 10 s.
+MAX_GROUP_SIZE = int(os.environ.get("QUPID_MAX_GROUP_SIZE", "5"))
+
+
+def to_unit(value):
+    try:
+        return float(value) / 100.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_simulation_args(payload):
+    omega_A = to_unit(payload.get("personATemperarment"))
+    omega_B = to_unit(payload.get("personBTemperarment"))
+    J_empathy = to_unit(payload.get("mutualEmpathy"))
+    J_compatability = to_unit(payload.get("mutualCompatability"))
+    drive_amplitude = to_unit(payload.get("mutualStrength"))
+    drive_freq = to_unit(payload.get("mutualFrequency"))
+    if drive_freq <= 0:
+        raise ValueError("mutualFrequency must be greater than 0")
+
+    rate_bit_flip_A = to_unit(payload.get("personAHotCold"))
+    rate_dephase_A = to_unit(payload.get("personADistant"))
+    rate_decay_A = to_unit(payload.get("personABurnedOut"))
+
+    rate_bit_flip_B = to_unit(payload.get("personBHotCold"))
+    rate_dephase_B = to_unit(payload.get("personBDistant"))
+    rate_decay_B = to_unit(payload.get("personBBurnedOut"))
+
+    mutual_sync = payload.get("mutualSync", 0)
+    rate_anti_corr = to_unit(100 - float(mutual_sync or 0))
+    rate_coll_decay = to_unit(payload.get("mutualCodependence"))
+
+    return {
+        "omega_A": omega_A,
+        "omega_B": omega_B,
+        "J_empathy": J_empathy,
+        "J_compatability": J_compatability,
+        "drive_amplitude": drive_amplitude,
+        "drive_freq": drive_freq,
+        "rate_bit_flip_A": rate_bit_flip_A,
+        "rate_dephase_A": rate_dephase_A,
+        "rate_decay_A": rate_decay_A,
+        "rate_bit_flip_B": rate_bit_flip_B,
+        "rate_dephase_B": rate_dephase_B,
+        "rate_decay_B": rate_decay_B,
+        "rate_anti_corr": rate_anti_corr,
+        "rate_coll_decay": rate_coll_decay,
+        "solver": payload.get("solver"),
+        "noise": payload.get("noise"),
+        "noise_channels": payload.get("noiseChannels"),
+        "drive_envelope": payload.get("driveEnvelope"),
+        "checkpoint": payload.get("checkpoint"),
+        "extend_periods": payload.get("extendPeriods"),
+    }
+
+
+def build_group_args(payload):
+    """
+    Maps the group payload (0-100 sliders, same meaning as the two-partner form)
+    onto run_group_simulation's people/edges schema.
+    """
+    people_payload = payload.get("people") or []
+    edges_payload = payload.get("edges") or []
+    if not isinstance(people_payload, list) or not isinstance(edges_payload, list):
+        raise ValueError("people and edges must be lists")
+    if len(people_payload) > MAX_GROUP_SIZE:
+        raise ValueError(f"at most {MAX_GROUP_SIZE} people per group")
+
+    people = []
+    names = []
+    for person in people_payload:
+        person = person or {}
+        names.append(str(person.get("name") or f"Person {len(names) + 1}")[:64])
+        people.append({
+            "omega": to_unit(person.get("temperament")),
+            "rate_bit_flip": to_unit(person.get("hotCold")),
+            "rate_dephase": to_unit(person.get("distant")),
+            "rate_decay": to_unit(person.get("burnedOut")),
+        })
+
+    edges = []
+    for edge in edges_payload:
+        edge = edge or {}
+        sync = edge.get("sync", 0)
+        edges.append({
+            "i": int(edge.get("source", 0)),
+            "j": int(edge.get("target", 0)),
+            "J_empathy": to_unit(edge.get("empathy")),
+            "J_compatibility": to_unit(edge.get("compatibility")),
+            "rate_anti_corr": to_unit(100 - float(sync or 0)),
+            "rate_coll_decay": to_unit(edge.get("codependence")),
+        })
+
+    drive_freq = to_unit(payload.get("mutualFrequency"))
+    if drive_freq <= 0:
+        raise ValueError("mutualFrequency must be greater than 0")
+
+    return {
+        "people": people,
+        "edges": edges,
+        "names": names,
+        "drive_amplitude": to_unit(payload.get("mutualStrength")),
+        "drive_freq": drive_freq,
+        "solver": payload.get("solver"),
+        "noise": payload.get("noise"),
+        "noise_channels": payload.get("noiseChannels"),
+    }
+
+
+# Slider -> (simulation argument, d argument / d slider point), as build_simulation_args.
+SLIDER_ARGS = {
+    "personATemperarment": ("omega_A", 0.01),
+    "personBTemperarment": ("omega_B", 0.01),
+    "mutualEmpathy": ("J_empathy", 0.01),
+    "mutualCompatability": ("J_compatability", 0.01),
+    "mutualStrength": ("drive_amplitude", 0.01),
+    "mutualFrequency": ("drive_freq", 0.01),
+    "personAHotCold": ("rate_bit_flip_A", 0.01),
+    "personADistant": ("rate_dephase_A", 0.01),
+    "personABurnedOut": ("rate_decay_A", 0.01),
+    "personBHotCold": ("rate_bit_flip_B", 0.01),
+    "personBDistant": ("rate_dephase_B", 0.01),
+    "personBBurnedOut": ("rate_decay_B", 0.01),
+    "mutualSync": ("rate_anti_corr", -0.01),
+    "mutualCodependence": ("rate_coll_decay", 0.01),
+}
+
+
+def slider_sensitivities(result):
+    """
+    Re-expresses qupid_sensitivity.sensitivities() output per slider point and
+    ranks the sliders by how much they move the health score.
+    """
+    d_score = {
+        slider: result["d_health_score"][arg] * factor for slider, (arg, factor) in SLIDER_ARGS.items()
+    }
+    d_metrics = {
+        name: {slider: values[arg] * factor for slider, (arg, factor) in SLIDER_ARGS.items()}
+        for name, values in result["d_metrics"].items()
+    }
+    ranked = [
+        {
+            "slider": slider,
+            "parameter": SLIDER_ARGS[slider][0],
+            "score_per_point": value,
+            "direction": "increase" if value > 0 else "decrease",
+        }
+        for slider, value in sorted(d_score.items(), key=lambda item: -abs(item[1]))
+        if value != 0
+    ]
+    return {"d_health_score": d_score, "d_metrics": d_metrics, "ranked": ranked}
+
+
+def describe_levers(ranked, limit=4):
+    """
+    One line per top slider for the report prompt, e.g. "mutualEmpathy: increase (+0.42 score / 10 points)".
+    """
+    return [
+        f"{row['slider']}: {row['direction']} ({abs(row['score_per_point']) * 10:+.2f} score / 10 points)"
+        for row in ranked[:limit]
+    ]
@@ -0,0 +1,76 @@
+import asyncio
+import copy
+import hashlib
+import json
+from collections import defaultdict
+
+
+def content_key(value):
+    """
+    Canonical hash of a JSON-like value (dict key order does not matter).
+    """
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def upload_key(files):
+    """
+    Hash of uploaded files' contents and types, in order. Leaves each stream rewound.
+    """
+    h = hashlib.sha256()
+    for file_storage in files:
+        file_storage.stream.seek(0)
+        data = file_storage.read()
+        file_storage.stream.seek(0)
+        h.update((file_storage.mimetype or "").encode("utf-8") + b"\x1f")
+        h.update(hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work: callers with the same (namespace, key)
+    while a computation is running attach to it and share its result or its
+    exception. Nothing is kept once the computation finishes.
+    """
+
+    def __init__(self):
+        self._running = {}
+        self.started = defaultdict(int)
+        self.coalesced = defaultdict(int)
+
+    async def run(self, namespace, key, factory):
+        """
+        `factory` is a zero-argument callable returning an awaitable; it is only
+        called when no identical computation is already in flight.
+        """
+        flight = (namespace, key)
+        task = self._running.get(flight)
+        if task is None:
+            self.started[namespace] += 1
+            # A separate task, so one caller disconnecting does not cancel the
+            # work the others are waiting on.
+            task = asyncio.ensure_future(factory())
+            self._running[flight] = task
+            task.add_done_callback(lambda done: self._finish(flight, done))
+        else:
+            self.coalesced[namespace] += 1
+        result = await asyncio.shield(task)
+        # Callers decorate their result dicts, so each gets its own copy.
+        return copy.deepcopy(result)
+
+    def _finish(self, flight, task):
+        if self._running.get(flight) is task:
+            del self._running[flight]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self):
+        return {
+            "in_flight": len(self._running),
+            "started": dict(self.started),
+            "coalesced": dict(self.coalesced),
+        }
+
+
+coalescer = SingleFlight()
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Per-request stage durations (seconds), emitted as a Server-Timing header.
+# The dict is shared, so stages timed in gathered child tasks still land on it.
+_timings = ContextVar("qupid_stage_timings", default=None)
+
+
+def begin():
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def record(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def server_timing(timings):
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def parse_server_timing(header):
+    """
+    {stage: seconds} from a Server-Timing header written by server_timing().
+    """
+    out = {}
+    for entry in (header or "").split(","):
+        name, _, rest = entry.strip().partition(";")
+        if name and rest.startswith("dur="):
+            try:
+                out[name] = float(rest[4:]) / 1000.0
+            except ValueError:
+                continue
+    return out
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built without it
+    brotli = None
+
+# Vite emits content-hashed names such as assets/index-3f9a1c2b.js.
+HASHED_NAME = re.compile(r"^assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+# Already-compressed formats gain nothing from gzip/brotli.
+INCOMPRESSIBLE = {".png", ".jpg", ".jpeg", ".gif", ".avif", ".webp", ".woff", ".woff2", ".gz", ".br", ".zip"}
+MIN_COMPRESS_BYTES = 512
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class StaticAsset:
+    __slots__ = ("path", "content_type", "cache_control", "variants")
+
+    def __init__(self, path, content_type, cache_control, variants):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # encoding ("identity", "gzip", "br") -> (body, etag)
+        self.variants = variants
+
+    def etags(self):
+        return {etag for _, etag in self.variants.values()}
+
+
+def _etag(body, suffix=""):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}{suffix}"'
+
+
+def _build_asset(rel_path, full_path):
+    with open(full_path, "rb") as fh:
+        body = fh.read()
+
+    content_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    cache_control = IMMUTABLE if HASHED_NAME.match(rel_path) else REVALIDATE
+
+    variants = {"identity": (body, _etag(body))}
+    ext = os.path.splitext(rel_path)[1].lower()
+    if ext not in INCOMPRESSIBLE and len(body) >= MIN_COMPRESS_BYTES:
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            variants["gzip"] = (gz, _etag(body, "-gz"))
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                variants["br"] = (br, _etag(body, "-br"))
+    return StaticAsset(rel_path, content_type, cache_control, variants)
+
+
+class AssetIndex:
+    """
+    In-memory table of the built frontend, with precompressed variants and ETags.
+    Unknown paths resolve to index.html so client-side routes keep working.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        if os.path.isdir(root):
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    full_path = os.path.join(dirpath, name)
+                    rel_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+                    self.assets[rel_path] = _build_asset(rel_path, full_path)
+
+    def resolve(self, path):
+        return self.assets.get(path) or self.assets.get("index.html")
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0.0:
+                    continue
+            except ValueError:
+                pass
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def select_variant(asset, accept_encoding):
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def not_modified(asset, if_none_match):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return bool(tags & asset.etags())
+
+
+def asset_headers(asset, encoding):
+    _, etag = asset.variants[encoding]
+    headers = {
+        "Content-Type": asset.content_type,
+        "Cache-Control": asset.cache_control,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return headers
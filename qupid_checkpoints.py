@@ -0,0 +1,132 @@
+"""
+Checkpoints for resuming a couple's simulation.
+
+A finished run carries a compact, JSON-safe checkpoint: the final time, the
+final density matrix (lab frame, plus the Floquet-frame matrix and basis key
+when the Floquet-Markov backend ran), a hash of the parameters and the
+trajectory so far. Handing it back with the same parameters extends the
+horizon. Handing it back with new parameters continues from that state under
+the new model. Either way only the new segment is solved and then stitched
+onto the stored trajectory.
+"""
+import hashlib
+import json
+
+import numpy as np
+from qutip import Qobj
+
+from qupid_group_dynamics import basis_key, floquet_frame_state, two_partner_model
+
+CHECKPOINT_VERSION = 1
+# Trajectory points a checkpoint may carry, and the most make_checkpoint stores:
+# older history is thinned so a checkpoint plus one extension stays readable.
+MAX_CHECKPOINT_POINTS = 5000
+CHECKPOINT_HISTORY_POINTS = 2000
+# At most a default run's worth of periods per resume, so it costs one /run.
+MAX_EXTEND_PERIODS = 10
+STEPS_PER_PERIOD = 20
+# Simulation args that do not change the physics of the segment being resumed.
+_RUN_OPTIONS = ("solver", "checkpoint", "extend_periods")
+
+
+def params_hash(params):
+    model_args = {key: value for key, value in (params or {}).items() if key not in _RUN_OPTIONS}
+    raw = json.dumps(model_args, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _encode_matrix(rho):
+    data = rho.full()
+    return {"re": data.real.tolist(), "im": data.imag.tolist()}
+
+
+def _decode_matrix(data, dims, name):
+    try:
+        matrix = np.asarray(data["re"], dtype=float) + 1j * np.asarray(data["im"], dtype=float)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"checkpoint {name} must be {{re, im}} matrices")
+    d = int(np.prod(dims[0]))
+    if matrix.shape != (d, d) or not np.all(np.isfinite(matrix)):
+        raise ValueError(f"checkpoint {name} must be a finite {d}x{d} matrix")
+    if not np.allclose(matrix, matrix.conj().T, atol=1e-8) or abs(np.trace(matrix) - 1.0) > 1e-6:
+        raise ValueError(f"checkpoint {name} is not a density matrix")
+    return Qobj(matrix, dims=dims)
+
+
+def _thin(tlist, points):
+    """
+    Indices of at most `points` samples of tlist, evenly spread and keeping both ends.
+    """
+    if len(tlist) <= points:
+        return np.arange(len(tlist))
+    return np.unique(np.rint(np.linspace(0, len(tlist) - 1, points)).astype(int))
+
+
+def make_checkpoint(params, tlist, happiness_A, happiness_B, final_rho, solver_name):
+    """
+    The checkpoint of a finished run of the A/B couple, its trajectory thinned
+    to CHECKPOINT_HISTORY_POINTS.
+    """
+    model = two_partner_model(params)
+    t = float(tlist[-1])
+    keep = _thin(tlist, CHECKPOINT_HISTORY_POINTS)
+    checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "t": t,
+        "periods": t / model["T"],
+        "params_hash": params_hash(params),
+        "solver": solver_name,
+        "rho": _encode_matrix(final_rho),
+        "trajectory": {
+            "t": np.asarray(tlist, dtype=float)[keep].tolist(),
+            "A": np.asarray(happiness_A, dtype=float)[keep].tolist(),
+            "B": np.asarray(happiness_B, dtype=float)[keep].tolist(),
+        },
+    }
+    if solver_name == "floquet_markov":
+        # The basis is still cached from the run, so this is a lookup and a transform.
+        key = basis_key(model)
+        checkpoint["basis_key"] = key
+        checkpoint["rho_floquet"] = _encode_matrix(floquet_frame_state(model, final_rho, t, key))
+    return checkpoint
+
+
+def read_checkpoint(checkpoint, model):
+    """
+    Validates a checkpoint for resuming `model`. Returns (start, trajectory,
+    params_hash): the solver start state and the stored (t, A, B) arrays.
+    """
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"checkpoint must be an object with version {CHECKPOINT_VERSION}")
+    dims = model["H_static"].dims
+    try:
+        trajectory = checkpoint["trajectory"]
+        t = float(checkpoint["t"])
+        times, A, B = (np.asarray(trajectory[key], dtype=float) for key in ("t", "A", "B"))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("checkpoint needs t and a {t, A, B} trajectory")
+    if times.ndim != 1 or not 2 <= len(times) <= MAX_CHECKPOINT_POINTS or A.shape != times.shape or B.shape != times.shape:
+        raise ValueError(f"checkpoint trajectory must hold 2-{MAX_CHECKPOINT_POINTS} matching points")
+    if not np.isfinite(t) or abs(times[-1] - t) > 1e-9 * max(1.0, abs(t)) or np.any(np.diff(times) <= 0):
+        raise ValueError("checkpoint trajectory must increase and end at t")
+
+    start = {"t": t, "rho": _decode_matrix(checkpoint.get("rho"), dims, "rho")}
+    if checkpoint.get("rho_floquet") is not None:
+        start["rho_floquet"] = _decode_matrix(checkpoint["rho_floquet"], dims, "rho_floquet")
+        start["basis_key"] = checkpoint.get("basis_key")
+    return start, (times, A, B), checkpoint.get("params_hash")
+
+
+def extension_periods(value):
+    """
+    The number of drive periods to add on resume (default 10).
+    """
+    if value in (None, ""):
+        return 10.0
+    try:
+        periods = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("extend_periods must be a number")
+    if not 0 < periods <= MAX_EXTEND_PERIODS:
+        raise ValueError(f"extend_periods must be in (0, {MAX_EXTEND_PERIODS}]")
+    return periods
@@ -0,0 +1,327 @@
+"""
+Natively evaluated drive coefficients, vectorized noise spectra and cached
+Floquet-basis rate matrices.
+`python qupid_coefficients.py` benchmarks Python callbacks per solve against
+the original lambda/closure formulation.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from qutip import Cubic_Spline, floquet_modes_t_lookup
+
+SPLINE_SAMPLES_PER_PERIOD = 512
+
+
+@lru_cache(maxsize=256)
+def drive_coefficient(w, n_periods=1):
+    """
+    sin(w t) as a cubic spline over [0, (n_periods + 1) T]. Slider-driven
+    frequencies are quantized, so the cache is shared across requests.
+    """
+    w = float(w)
+    n_periods = max(1, int(math.ceil(n_periods)))
+    # One spare period so adaptive integrator steps never leave the table.
+    t_max = (n_periods + 1) * (2 * np.pi) / w
+    samples = (n_periods + 1) * SPLINE_SAMPLES_PER_PERIOD + 1
+    tlist = np.linspace(0.0, t_max, samples)
+    return Cubic_Spline(0.0, t_max, np.sin(w * tlist))
+
+
+class WhiteSpectrum:
+    """
+    Flat noise spectrum S(w) = rate / 2π, evaluated on arrays of frequencies.
+    Every spectrum is `rate` times a unit shape, so rate matrices can be cached
+    per shape and rescaled when only the rate changes.
+    """
+
+    __slots__ = ("rate",)
+    kind = "white"
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+
+    @property
+    def shape_key(self):
+        return (self.kind,)
+
+    def unit(self, w):
+        return np.full(np.shape(w), 1.0 / (2 * np.pi))
+
+    def __call__(self, w):
+        return self.rate * self.unit(w)
+
+
+class LorentzianSpectrum(WhiteSpectrum):
+    """
+    Exponentially correlated (telegraph / Ornstein-Uhlenbeck) noise:
+    S(w) = rate / 2π * width^2 / (w^2 + width^2). Equal to white noise at w = 0.
+    """
+
+    __slots__ = ("width",)
+    kind = "lorentzian"
+
+    def __init__(self, rate, width=1.0):
+        super().__init__(rate)
+        self.width = float(width)
+
+    @property
+    def shape_key(self):
+        return (self.kind, self.width)
+
+    def unit(self, w):
+        w = np.asarray(w, dtype=float)
+        return self.width ** 2 / (w ** 2 + self.width ** 2) / (2 * np.pi)
+
+
+class OhmicSpectrum(WhiteSpectrum):
+    """
+    Ohmic bath with exponential cutoff, scaled to peak at rate / 2π at w = cutoff:
+    S(w) = rate / 2π * (|w| / cutoff) exp(1 - |w| / cutoff).
+    """
+
+    __slots__ = ("cutoff",)
+    kind = "ohmic"
+
+    def __init__(self, rate, cutoff=2.0):
+        super().__init__(rate)
+        self.cutoff = float(cutoff)
+
+    @property
+    def shape_key(self):
+        return (self.kind, self.cutoff)
+
+    def unit(self, w):
+        x = np.abs(np.asarray(w, dtype=float)) / self.cutoff
+        return x * np.exp(1.0 - x) / (2 * np.pi)
+
+
+class PinkSpectrum(WhiteSpectrum):
+    """
+    1/f^alpha noise, equal to white noise at w = corner and flattened below
+    `floor` so the zero-frequency (dephasing) terms stay finite.
+    """
+
+    __slots__ = ("corner", "alpha", "floor")
+    kind = "1/f"
+
+    def __init__(self, rate, corner=1.0, alpha=1.0, floor=1e-3):
+        super().__init__(rate)
+        self.corner = float(corner)
+        self.alpha = float(alpha)
+        self.floor = float(floor)
+
+    @property
+    def shape_key(self):
+        return (self.kind, self.corner, self.alpha, self.floor)
+
+    def unit(self, w):
+        w = np.maximum(np.abs(np.asarray(w, dtype=float)), self.floor)
+        return (self.corner / w) ** self.alpha / (2 * np.pi)
+
+
+SPECTRA = {cls.kind: cls for cls in (WhiteSpectrum, LorentzianSpectrum, OhmicSpectrum, PinkSpectrum)}
+
+
+def white_spectrum(rate):
+    return WhiteSpectrum(rate)
+
+
+def make_spectrum(rate, spec=None):
+    """
+    A noise spectrum for one channel. `spec` is None / a kind name / a dict
+    like {"kind": "lorentzian", "width": 0.5}; other keys are shape parameters.
+    """
+    if spec is None:
+        return WhiteSpectrum(rate)
+    if isinstance(spec, str):
+        spec = {"kind": spec}
+    spec = dict(spec)
+    kind = spec.pop("kind", "white")
+    if kind not in SPECTRA:
+        raise ValueError(f"unknown noise spectrum {kind!r}; expected one of {sorted(SPECTRA)}")
+    try:
+        return SPECTRA[kind](rate, **{key: float(value) for key, value in spec.items()})
+    except TypeError as exc:
+        raise ValueError(f"invalid parameters for {kind} spectrum: {exc}") from None
+
+
+def floquet_transition_amplitudes(f_modes_table_t, T, c_op, kmax=5, n_samples=100):
+    """
+    Fourier components X[a, b, k] of c_op in the Floquet basis. These depend on
+    the basis and the operator but not on the spectrum.
+    """
+    omega = (2 * np.pi) / T
+    dT = T / n_samples
+    ks = np.arange(-kmax, kmax + 1)
+    c_mat = c_op.full()
+
+    X = None
+    for t in np.arange(dT, T + dT / 2, dT):
+        modes = floquet_modes_t_lookup(f_modes_table_t, t, T)
+        V = np.column_stack([mode.full().ravel() for mode in modes])
+        term = (dT / T) * (V.conj().T @ c_mat @ V)[:, :, None] * np.exp(-1j * ks * omega * t)[None, None, :]
+        X = term if X is None else X + term
+    return X
+
+
+def rates_from_amplitudes(X, f_energies, T, spectrum, kmax=5):
+    """
+    Floquet-basis rate matrix A[a, b] at zero temperature for one spectrum.
+    """
+    f_energies = np.asarray(f_energies)
+    omega = (2 * np.pi) / T
+    ks = np.arange(-kmax, kmax + 1)
+    delta = f_energies[:, None, None] - f_energies[None, :, None] + ks[None, None, :] * omega
+    heaviside = (np.sign(delta) + 1) / 2.0
+    gamma = 2 * np.pi * heaviside * np.asarray(spectrum(delta)) * np.abs(X) ** 2
+    return gamma.sum(axis=2)
+
+
+def floquet_rate_matrix(f_modes_table_t, f_energies, T, c_op, spectrum, kmax=5, n_samples=100):
+    """
+    Vectorized equivalent of qutip.floquet_master_equation_rates at zero
+    temperature. Returns the Floquet-basis rate matrix A[a, b].
+    """
+    X = floquet_transition_amplitudes(f_modes_table_t, T, c_op, kmax, n_samples)
+    return rates_from_amplitudes(X, f_energies, T, spectrum, kmax)
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+RATE_CACHE_SIZE = int(os.environ.get("QUPID_RATE_CACHE", "512"))
+_amplitude_cache = LRUCache(RATE_CACHE_SIZE)
+_unit_rate_cache = LRUCache(RATE_CACHE_SIZE)
+
+
+def cached_rate_matrix(basis_key, channel_key, f_modes_table_t, f_energies, T, c_op, spectrum):
+    """
+    floquet_rate_matrix with the unit-amplitude matrix cached per (Floquet
+    basis, channel, spectrum shape); a rate change only rescales it.
+    """
+    key = (basis_key, channel_key, spectrum.shape_key)
+    unit = _unit_rate_cache.get(key)
+    if unit is None:
+        X = _amplitude_cache.get((basis_key, channel_key))
+        if X is None:
+            X = floquet_transition_amplitudes(f_modes_table_t, T, c_op)
+            _amplitude_cache.put((basis_key, channel_key), X)
+        unit = rates_from_amplitudes(X, f_energies, T, spectrum.unit)
+        _unit_rate_cache.put(key, unit)
+    return spectrum.rate * unit
+
+
+def clear_rate_cache():
+    for cache in (_amplitude_cache, _unit_rate_cache):
+        with cache.lock:
+            cache.entries.clear()
+
+
+def rate_cache_stats():
+    return {
+        "amplitudes": {"size": len(_amplitude_cache.entries), "hits": _amplitude_cache.hits, "misses": _amplitude_cache.misses},
+        "rate_matrices": {"size": len(_unit_rate_cache.entries), "hits": _unit_rate_cache.hits, "misses": _unit_rate_cache.misses},
+    }
+
+
+def _benchmark():
+    # Run as a script this file is __main__; the solver uses the imported module,
+    # so that is the one to instrument.
+    from qutip import fmmesolve
+
+    import qupid_coefficients as coefficients
+    from qupid_group_dynamics import clear_floquet_caches, evolve_floquet_markov, two_partner_model
+
+    model = two_partner_model({})
+    calls = {"drive": 0, "spectrum": 0}
+
+    def counted_drive(t, args):
+        calls["drive"] += 1
+        return np.sin(args["w"] * t)
+
+    def counted_spectrum(rate):
+        def spectrum(w):
+            calls["spectrum"] += 1
+            return rate / (2 * np.pi)
+        return spectrum
+
+    H = [model["H_static"], [model["H_drive"], counted_drive]]
+    tlist = np.linspace(0.0, 10 * model["T"], 200)
+    start = time.perf_counter()
+    fmmesolve(
+        H, model["psi0"], tlist, model["c_ops"], [],
+        [counted_spectrum(rate) for rate in model["rates"]],
+        T=model["T"], args=model["args"],
+    )
+    legacy_time = time.perf_counter() - start
+    legacy_calls = dict(calls)
+
+    original_unit = coefficients.WhiteSpectrum.unit
+    original_spline_call = Cubic_Spline.__call__
+
+    def counted_unit(self, w):
+        calls["spectrum"] += 1
+        return original_unit(self, w)
+
+    def counted_spline_call(self, *args, **kwargs):
+        # Only reached when qutip evaluates the spline from Python.
+        calls["drive"] += 1
+        return original_spline_call(self, *args, **kwargs)
+
+    def timed_solve():
+        calls.update(drive=0, spectrum=0)
+        start = time.perf_counter()
+        evolve_floquet_markov(model)
+        return dict(calls), time.perf_counter() - start
+
+    coefficients.WhiteSpectrum.unit = counted_unit
+    Cubic_Spline.__call__ = counted_spline_call
+    try:
+        coefficients.drive_coefficient.cache_clear()
+        clear_floquet_caches()
+        cold_calls, cold_time = timed_solve()
+        warm_calls, warm_time = timed_solve()
+    finally:
+        coefficients.WhiteSpectrum.unit = original_unit
+        Cubic_Spline.__call__ = original_spline_call
+
+    print(f"{'path':<28}{'drive callbacks':>18}{'spectrum calls':>18}{'seconds':>10}")
+    rows = [
+        ("lambda + closures", legacy_calls, legacy_time),
+        ("spline + vectorized (cold)", cold_calls, cold_time),
+        ("spline + cached (warm)", warm_calls, warm_time),
+    ]
+    for label, counts, seconds in rows:
+        print(f"{label:<28}{counts['drive']:>18}{counts['spectrum']:>18}{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
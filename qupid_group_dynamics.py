@@ -0,0 +1,327 @@
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+import scipy.sparse as sp
+from qutip import (
+    Qobj,
+    basis,
+    floquet_modes,
+    floquet_modes_t_lookup,
+    floquet_modes_table,
+    tensor,
+)
+from qutip.floquet import floquet_markov_mesolve, floquet_master_equation_tensor
+
+from qupid_coefficients import (
+    LRUCache,
+    cached_rate_matrix,
+    clear_rate_cache,
+    drive_coefficient,
+    make_spectrum,
+)
+
+MIN_PARTNERS = 2
+MAX_PARTNERS = 8
+
+_PAULI = {
+    "x": sp.csr_matrix(np.array([[0, 1], [1, 0]], dtype=complex)),
+    "y": sp.csr_matrix(np.array([[0, -1j], [1j, 0]], dtype=complex)),
+    "z": sp.csr_matrix(np.array([[1, 0], [0, -1]], dtype=complex)),
+    "m": sp.csr_matrix(np.array([[0, 0], [1, 0]], dtype=complex)),
+}
+
+PERSON_DEFAULTS = {
+    "omega": 1.0,
+    "rate_bit_flip": 0.05,
+    "rate_dephase": 0.2,
+    "rate_decay": 0.01,
+}
+EDGE_DEFAULTS = {
+    "J_empathy": 0.1,
+    "J_compatibility": 0.05,
+    "rate_anti_corr": 0.9,
+    "rate_coll_decay": 0.02,
+}
+
+
+class IntegrationError(RuntimeError):
+    """
+    The ODE integrator gave up before the end of the time grid.
+    """
+
+
+@lru_cache(maxsize=None)
+def site_operators(n):
+    """
+    Sparse single-partner operators (σx, σy, σz, σ-) on an n-partner register.
+    Partner 0 is the leftmost tensor factor, matching tensor(op_A, op_B).
+    """
+    dims = [[2] * n, [2] * n]
+    ops = {}
+    for k in range(n):
+        left = sp.identity(2 ** k, dtype=complex, format="csr")
+        right = sp.identity(2 ** (n - k - 1), dtype=complex, format="csr")
+        for name, mat in _PAULI.items():
+            ops[(name, k)] = Qobj(sp.kron(sp.kron(left, mat), right, format="csr"), dims=dims)
+    return ops
+
+
+@lru_cache(maxsize=None)
+def pair_operators(n, pairs):
+    """
+    Pairwise coupling and collective-noise templates for one graph topology.
+    `pairs` is a tuple of (i, j) edges so the result can be cached.
+    """
+    site = site_operators(n)
+    ops = {}
+    for i, j in pairs:
+        ops[(i, j)] = {
+            "flip_flop": site[("x", i)] * site[("x", j)] + site[("y", i)] * site[("y", j)],
+            "zz": site[("z", i)] * site[("z", j)],
+            "mm": site[("m", i)] * site[("m", j)],
+        }
+    return ops
+
+
+def _edge_pair(edge, n):
+    i, j = int(edge["i"]), int(edge["j"])
+    if i == j or not (0 <= i < n and 0 <= j < n):
+        raise ValueError(f"invalid edge ({i}, {j}) for {n} partners")
+    return (i, j) if i < j else (j, i)
+
+
+def _sum_ops(ops):
+    total = ops[0]
+    for op in ops[1:]:
+        total = total + op
+    return total
+
+
+def build_group_model(people, edges, drive_amplitude=1.5, drive_freq=1.0, noise=None, noise_channels="first"):
+    """
+    Builds the Hamiltonian, drive and collapse operators for an n-partner group.
+
+    people: list of dicts with omega, rate_bit_flip, rate_dephase, rate_decay.
+    edges: list of dicts with i, j, J_empathy, J_compatibility, rate_anti_corr,
+    rate_coll_decay.
+    noise: optional {channel label or "default": spectrum spec} (see
+    qupid_coefficients.make_spectrum); channels are white by default.
+    noise_channels: "first" feeds only the first channel to the Floquet-Markov
+    rates, as fmmesolve does; "all" sums every channel.
+    """
+    if noise_channels not in ("first", "all"):
+        raise ValueError(f"noise_channels must be 'first' or 'all', got {noise_channels!r}")
+    n = len(people)
+    if not MIN_PARTNERS <= n <= MAX_PARTNERS:
+        raise ValueError(f"group size must be between {MIN_PARTNERS} and {MAX_PARTNERS}, got {n}")
+
+    people = [{**PERSON_DEFAULTS, **p} for p in people]
+    edges = [{**EDGE_DEFAULTS, **e} for e in edges]
+    pairs = tuple(_edge_pair(e, n) for e in edges)
+    if len(set(pairs)) != len(pairs):
+        raise ValueError("duplicate edges in group graph")
+
+    site = site_operators(n)
+    pair_ops = pair_operators(n, pairs)
+
+    static_terms = [float(person["omega"]) * site[("z", k)] for k, person in enumerate(people)]
+    for pair, edge in zip(pairs, edges):
+        static_terms.append(float(edge["J_empathy"]) * pair_ops[pair]["flip_flop"])
+        static_terms.append(float(edge["J_compatibility"]) * pair_ops[pair]["zz"])
+    H_static = _sum_ops(static_terms)
+    H_drive = float(drive_amplitude) * _sum_ops([site[("x", k)] for k in range(n)])
+
+    # Per-partner channels first, then shared channels: the same order as the
+    # hand-built two-partner list, so solver results are unchanged for n = 2.
+    c_ops, rates, labels = [], [], []
+    for k, person in enumerate(people):
+        for op_name, rate_key in (("x", "rate_bit_flip"), ("z", "rate_dephase"), ("m", "rate_decay")):
+            c_ops.append(site[(op_name, k)])
+            rates.append(float(person[rate_key]))
+            labels.append(f"{rate_key}_{k}")
+    for pair, edge in zip(pairs, edges):
+        for op_name, rate_key in (("zz", "rate_anti_corr"), ("mm", "rate_coll_decay")):
+            c_ops.append(pair_ops[pair][op_name])
+            rates.append(float(edge[rate_key]))
+            labels.append(f"{rate_key}_{pair[0]}_{pair[1]}")
+
+    noise = noise or {}
+    spectra = [make_spectrum(rate, noise.get(label, noise.get("default"))) for rate, label in zip(rates, labels)]
+
+    drive_freq = float(drive_freq)
+    return {
+        "n": n,
+        "pairs": pairs,
+        "H_static": H_static,
+        "H_drive": H_drive,
+        "drive_amplitude": float(drive_amplitude),
+        "drive_freq": drive_freq,
+        "T": (2 * np.pi) / drive_freq,
+        "args": {"w": drive_freq},
+        "c_ops": c_ops,
+        "rates": rates,
+        "labels": labels,
+        "spectra": spectra,
+        "noise_channels": noise_channels,
+        "sz": [site[("z", k)] for k in range(n)],
+        "sz_pairs": [pair_ops[pair]["zz"] for pair in pairs],
+        "psi0": tensor([basis(2, 0)] * n),
+    }
+
+
+def two_partner_model(params):
+    """
+    The original A/B couple expressed as a 2-partner group.
+    """
+    params = params or {}
+    person_A = {
+        "omega": float(params.get("omega_A", 1.0)),
+        "rate_bit_flip": float(params.get("rate_bit_flip_A", 0.05)),
+        "rate_dephase": float(params.get("rate_dephase_A", 0.2)),
+        "rate_decay": float(params.get("rate_decay_A", 0.01)),
+    }
+    person_B = {
+        "omega": float(params.get("omega_B", 1.4)),
+        "rate_bit_flip": float(params.get("rate_bit_flip_B", 0.01)),
+        "rate_dephase": float(params.get("rate_dephase_B", 0.05)),
+        "rate_decay": float(params.get("rate_decay_B", 0.1)),
+    }
+    edge = {
+        "i": 0,
+        "j": 1,
+        "J_empathy": float(params.get("J_empathy", 0.1)),
+        "J_compatibility": float(params.get("J_compatibility", params.get("J_compatability", 0.05))),
+        "rate_anti_corr": float(params.get("rate_anti_corr", 0.9)),
+        "rate_coll_decay": float(params.get("rate_coll_decay", 0.02)),
+    }
+    return build_group_model(
+        [person_A, person_B],
+        [edge],
+        drive_amplitude=float(params.get("drive_amplitude", 1.5)),
+        drive_freq=float(params.get("drive_freq", 1.0)),
+        noise=params.get("noise"),
+        noise_channels=params.get("noise_channels") or "first",
+    )
+
+
+def model_hamiltonian(model, n_periods=1):
+    """
+    H(t) = H_static + sin(w t) H_drive, with the drive as a cached spline
+    covering at least n_periods.
+    """
+    return [model["H_static"], [model["H_drive"], drive_coefficient(model["drive_freq"], n_periods)]]
+
+
+def floquet_channel_indices(model, include_off=False):
+    """
+    Noise channels that enter the Floquet-Markov rates (switched-off ones
+    skipped unless include_off).
+    """
+    candidates = range(len(model["c_ops"])) if model["noise_channels"] == "all" else range(min(1, len(model["c_ops"])))
+    return [c for c in candidates if include_off or model["rates"][c] > 0.0]
+
+
+def _operator_key(op):
+    return hashlib.sha256(np.ascontiguousarray(op.full()).tobytes()).hexdigest()
+
+
+def basis_key(model):
+    """
+    Identifies the Floquet basis: it depends on the Hamiltonian and drive only,
+    not on the noise rates.
+    """
+    h = hashlib.sha256()
+    for op in (model["H_static"], model["H_drive"]):
+        h.update(np.ascontiguousarray(op.full()).tobytes())
+    h.update(repr(model["drive_freq"]).encode("ascii"))
+    return h.hexdigest()
+
+
+FLOQUET_CACHE_SIZE = int(os.environ.get("QUPID_FLOQUET_CACHE", "64"))
+# Mode tables grow as 4^n; only small registers are worth keeping.
+FLOQUET_CACHE_MAX_DIM = 16
+_basis_cache = LRUCache(FLOQUET_CACHE_SIZE)
+
+
+def floquet_basis(model, key=None):
+    """
+    (f_modes_0, f_energies, f_modes_table_t), cached per Floquet basis so
+    noise-only slider changes skip the mode computation.
+    """
+    key = key or basis_key(model)
+    cached = _basis_cache.get(key)
+    if cached is not None:
+        return cached
+    H = model_hamiltonian(model)
+    T = model["T"]
+    args = model["args"]
+    f_modes_0, f_energies = floquet_modes(H, T, args)
+    f_modes_table_t = floquet_modes_table(
+        f_modes_0, f_energies, np.linspace(0, T, 500 + 1), H, T, args
+    )
+    basis = (f_modes_0, f_energies, f_modes_table_t)
+    if model["H_static"].shape[0] <= FLOQUET_CACHE_MAX_DIM:
+        _basis_cache.put(key, basis)
+    return basis
+
+
+def clear_floquet_caches():
+    with _basis_cache.lock:
+        _basis_cache.entries.clear()
+    clear_rate_cache()
+
+
+def floquet_frame_state(model, rho, t, key=None):
+    """
+    A lab-frame density matrix at time t expressed in the Floquet modes at t.
+    """
+    key = key or basis_key(model)
+    _, _, f_modes_table_t = floquet_basis(model, key)
+    return rho.transform(floquet_modes_t_lookup(f_modes_table_t, t, model["T"]))
+
+
+def evolve_floquet_markov(model, n_periods=10, n_steps=200, start=None):
+    """
+    Floquet-Markov evolution of a model from its initial state, or from
+    `start` ({"t", lab-frame "rho", and optionally "rho_floquet" with the
+    "basis_key" it was taken in}). Returns the time grid and the lab-frame
+    density matrix at each time.
+    """
+    T = model["T"]
+    t0 = float(start["t"]) if start else 0.0
+    tlist = np.linspace(t0, t0 + n_periods * T, n_steps)
+    key = basis_key(model)
+    f_modes_0, f_energies, f_modes_table_t = floquet_basis(model, key)
+
+    # Same steps as qutip's fmmesolve, reusing the modes computed above instead
+    # of solving for them a second time. By default the rate tensor is built
+    # from the first collapse operator/spectrum pair only, like fmmesolve
+    # (qutip 4.7); noise_channels="all" sums the rates of every channel.
+    rates = np.zeros((len(f_energies), len(f_energies)))
+    for c in floquet_channel_indices(model):
+        c_op = model["c_ops"][c]
+        rates = rates + cached_rate_matrix(
+            key, _operator_key(c_op), f_modes_table_t, f_energies, T, c_op, model["spectra"][c]
+        )
+    R = floquet_master_equation_tensor(rates, f_energies)
+    rho0 = model["psi0"]
+    if start:
+        # The Floquet-frame equation is autonomous, so a run resumes from the
+        # Floquet-frame state at t0; qutip maps rho0 into that frame with the
+        # t = 0 modes, so hand it over in those.
+        rho_floquet = start.get("rho_floquet") if start.get("basis_key") == key else None
+        if rho_floquet is None:
+            rho_floquet = floquet_frame_state(model, start["rho"], t0, key)
+        rho0 = rho_floquet.transform(f_modes_0, True)
+    output = floquet_markov_mesolve(R, rho0, tlist, [], f_modes_0=f_modes_0)
+    if len(output.states) < len(tlist):
+        # qutip stops storing states, without raising, once zvode fails.
+        raise IntegrationError(f"Floquet-Markov integration stopped after {len(output.states)} of {len(tlist)} steps")
+
+    states = []
+    for idx, t in enumerate(tlist):
+        f_modes_t = floquet_modes_t_lookup(f_modes_table_t, t, T)
+        states.append(output.states[idx].transform(f_modes_t, True))
+    return tlist, states
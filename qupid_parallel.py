@@ -0,0 +1,28 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+
+def default_workers():
+    return max(1, int(os.environ.get("QUPID_PARALLEL_WORKERS", os.cpu_count() or 1)))
+
+
+def make_executor(max_workers=None, thread_name_prefix="qupid"):
+    """
+    Process pool for CPU-bound simulation work. Daemonic processes (e.g.
+    hypercorn workers) cannot spawn children, so they get a thread pool.
+    """
+    max_workers = max_workers or default_workers()
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def spawn_seeds(seed, count):
+    """
+    Independent, reproducible 32-bit seeds derived from one root seed.
+    """
+    children = np.random.SeedSequence(seed).spawn(count)
+    return [int(child.generate_state(1)[0]) for child in children]
@@ -0,0 +1,200 @@
+"""
+Non-periodic drive from a conversation's real rhythm.
+
+activity_envelope() bins message timestamps, smooths the counts and
+normalizes them onto [0, 1]. The couple then evolves under
+
+    H(t) = H_static + e(t) H_drive
+
+instead of sin(w t) H_drive. The envelope follows the timeline's bursts,
+silences and weekly cycles, so there is no Floquet basis. Evolution uses
+piecewise-constant propagators: e(t) is sampled at SUBSTEPS points per bin
+and quantized to ENVELOPE_LEVELS values, and each exp(L(e) dt) is computed
+once and cached per (generator, level, dt). A multi-month timeline is then
+one small matrix-vector product per substep. The dissipator is the weak-drive
+one of the lindblad backend (qupid_solvers.secular_jump_operators).
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+from qutip import Qobj, ket2dm, liouvillian, operator_to_vector
+from scipy.linalg import expm
+
+from qupid_coefficients import LRUCache
+from qupid_solvers import secular_jump_operators
+
+ENVELOPE_BIN_HOURS = float(os.environ.get("QUPID_RHYTHM_BIN_HOURS", "6"))
+ENVELOPE_SMOOTHING_BINS = float(os.environ.get("QUPID_RHYTHM_SMOOTHING", "2"))
+ENVELOPE_MAX_BINS = 4096
+ENVELOPE_LEVELS = int(os.environ.get("QUPID_RHYTHM_LEVELS", "32"))
+# Real time per drive period T: one day, so daily and weekly cycles keep their shape.
+HOURS_PER_PERIOD = 24.0
+SUBSTEPS = 4
+PROPAGATOR_CACHE_SIZE = int(os.environ.get("QUPID_PROPAGATOR_CACHE", "256"))
+_propagator_cache = LRUCache(PROPAGATOR_CACHE_SIZE)
+
+
+def _smooth(counts, sigma):
+    if sigma <= 0 or len(counts) < 2:
+        return counts
+    radius = int(np.ceil(3 * sigma))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+    padded = np.pad(counts, radius, mode="reflect" if len(counts) > radius else "edge")
+    return np.convolve(padded, kernel, mode="valid")
+
+
+def activity_envelope(timestamps, bin_hours=None, smoothing_bins=None):
+    """
+    Message activity over time as {"values": [...], "bin_hours": h}: counts per
+    bin, Gaussian-smoothed and scaled so the busiest bin is 1. Bins widen if the
+    timeline would need more than ENVELOPE_MAX_BINS.
+    """
+    stamps = sorted(ts for ts in timestamps if ts is not None)
+    if len(stamps) < 2 or stamps[0] == stamps[-1]:
+        raise ValueError("a rhythm drive needs at least two distinct message timestamps")
+    bin_hours = ENVELOPE_BIN_HOURS if bin_hours is None else float(bin_hours)
+    smoothing_bins = ENVELOPE_SMOOTHING_BINS if smoothing_bins is None else float(smoothing_bins)
+
+    hours = np.array([(ts - stamps[0]).total_seconds() / 3600.0 for ts in stamps])
+    bin_hours = max(bin_hours, hours[-1] / ENVELOPE_MAX_BINS)
+    n_bins = int(hours[-1] // bin_hours) + 1
+    counts = np.bincount(np.minimum((hours / bin_hours).astype(int), n_bins - 1), minlength=n_bins)
+    smoothed = _smooth(counts.astype(float), smoothing_bins)
+    return {
+        "values": (smoothed / smoothed.max()).tolist(),
+        "bin_hours": bin_hours,
+        "start": stamps[0].isoformat(),
+    }
+
+
+def _envelope_values(envelope):
+    """
+    Accepts an activity_envelope() dict or a bare list of values (bin_hours
+    defaults to ENVELOPE_BIN_HOURS). Returns (values, bin_hours).
+    """
+    if isinstance(envelope, dict):
+        values, bin_hours = envelope.get("values"), envelope.get("bin_hours", ENVELOPE_BIN_HOURS)
+    else:
+        values, bin_hours = envelope, ENVELOPE_BIN_HOURS
+    try:
+        values = np.asarray(values, dtype=float)
+        bin_hours = float(bin_hours)
+    except (TypeError, ValueError):
+        raise ValueError("drive envelope must be a list of numbers or {values, bin_hours}")
+    if values.ndim != 1 or len(values) == 0 or not np.all(np.isfinite(values)):
+        raise ValueError("drive envelope must be a non-empty list of finite numbers")
+    if len(values) > ENVELOPE_MAX_BINS:
+        raise ValueError(f"drive envelope has more than {ENVELOPE_MAX_BINS} bins")
+    if not bin_hours > 0:
+        raise ValueError("drive envelope bin_hours must be positive")
+    return np.clip(values, 0.0, 1.0), bin_hours
+
+
+def _substep_levels(values):
+    """
+    The envelope linearly interpolated at the midpoint of each substep and
+    quantized to ENVELOPE_LEVELS, as level indices.
+    """
+    n_bins = len(values)
+    midpoints = (np.arange(n_bins * SUBSTEPS) + 0.5) / SUBSTEPS
+    # Bin values sit at bin centres; hold them flat before the first and after the last.
+    sampled = np.interp(midpoints, np.arange(n_bins) + 0.5, values)
+    return np.rint(sampled * (ENVELOPE_LEVELS - 1)).astype(int)
+
+
+def _generator_key(L0, L1, dt):
+    h = hashlib.sha256()
+    for L in (L0, L1):
+        h.update(np.ascontiguousarray(L).tobytes())
+    h.update(repr(round(dt, 12)).encode("ascii"))
+    h.update(repr(ENVELOPE_LEVELS).encode("ascii"))
+    return h.hexdigest()
+
+
+def _propagators(L0, L1, dt, levels):
+    """
+    exp((L0 + e L1) dt) for each quantized level e in `levels`, cached.
+    """
+    key = _generator_key(L0, L1, dt)
+    out = {}
+    for level in levels:
+        propagator = _propagator_cache.get((key, level))
+        if propagator is None:
+            e = level / (ENVELOPE_LEVELS - 1)
+            propagator = expm((L0 + e * L1) * dt)
+            _propagator_cache.put((key, level), propagator)
+        out[level] = propagator
+    return out
+
+
+def evolve_envelope(model, envelope):
+    """
+    Evolves `model` from its initial state under the drive envelope. Returns
+    (tlist, states) sampled at t = 0 and the end of every bin.
+    """
+    values, bin_hours = _envelope_values(envelope)
+    dt = model["T"] * (bin_hours / HOURS_PER_PERIOD) / SUBSTEPS
+    L0 = liouvillian(model["H_static"], secular_jump_operators(model)).full()
+    L1 = liouvillian(model["H_drive"]).full()
+    levels = _substep_levels(values)
+    propagators = _propagators(L0, L1, dt, np.unique(levels).tolist())
+
+    dims = model["H_static"].dims
+    d = model["H_static"].shape[0]
+    vec = operator_to_vector(ket2dm(model["psi0"])).full().ravel()
+    # Column-stacked vectors, as qutip's operator_to_vector.
+    states = [Qobj(vec.reshape(d, d).T, dims=dims)]
+    for step, level in enumerate(levels, start=1):
+        vec = propagators[level] @ vec
+        if step % SUBSTEPS == 0:
+            states.append(Qobj(vec.reshape(d, d).T, dims=dims))
+    tlist = np.arange(len(states)) * dt * SUBSTEPS
+    return tlist, states
+
+
+def solve_envelope(model, envelope):
+    """
+    evolve_envelope() with the same (tlist, states, info) shape as qupid_solvers.solve.
+    """
+    start = time.perf_counter()
+    tlist, states = evolve_envelope(model, envelope)
+    return tlist, states, {
+        "solver": "envelope",
+        "requested": "envelope",
+        "error_estimate": 0.0,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def clear_propagator_cache():
+    with _propagator_cache.lock:
+        _propagator_cache.entries.clear()
+
+
+def propagator_cache_stats():
+    return {"size": len(_propagator_cache.entries), "hits": _propagator_cache.hits, "misses": _propagator_cache.misses}
+
+
+if __name__ == "__main__":
+    from datetime import datetime, timedelta
+
+    from qupid_group_dynamics import two_partner_model
+
+    # Four months of evening-heavy texting with quiet weekends.
+    rng = np.random.default_rng(0)
+    origin = datetime(2024, 1, 1)
+    stamps = [
+        origin + timedelta(days=day, hours=float(hour))
+        for day in range(120)
+        for hour in rng.normal(20, 2, size=3 if day % 7 >= 5 else 15)
+    ]
+    envelope = activity_envelope(stamps)
+    model = two_partner_model({})
+    for label in ("cold", "warm"):
+        tlist, states, info = solve_envelope(model, envelope)
+        print(f"{label}: {len(envelope['values'])} bins, {len(states)} states in {info['seconds'] * 1000:.1f} ms")
+    print(propagator_cache_stats())
@@ -0,0 +1,312 @@
+"""
+Parameter sensitivities of the health score and trajectory metrics, for the
+backend /run would use on the same arguments (qupid_solvers.resolve_solver).
+
+When that is the `lindblad` backend, all 14 derivatives come from one
+tangent-linear solve. The Floquet-Markov and rotating-frame backends are
+differentiated by central differences of their own solves instead. Rate-only
+steps reuse the cached Floquet basis and rate matrices, so only the six
+Hamiltonian parameters cost a new basis.
+
+For the tangent-linear solve, the couple is propagated as a Lindblad problem
+(exact drive, Floquet dissipator in its weak-drive limit) together with ∂ρ/∂θ
+for all 14 simulation arguments:
+
+    dρ/dτ   = M(τ) ρ
+    ds_i/dτ = M(τ) s_i + ∂M/∂θ_i ρ,      M(τ) = T (L0 + sin(2πτ) L1)
+
+Time is measured in drive periods (τ = t / T), so the drive frequency enters
+only through T and needs no derivative of the drive itself. ∂L0/∂θ and ∂L1/∂θ
+come from central differences of the generator, which is cheap to rebuild,
+not of the solve. The perturbed generators keep the secular grouping of the
+base point, so the derivative stays finite where transitions are degenerate
+(e.g. J_compatability = 0). The derivatives are then chained through
+calculate_hybrid_score and compute_trajectory_metrics.
+`python qupid_sensitivity.py` checks the result against finite differences.
+"""
+import numpy as np
+from qutip import Qobj, ket2dm, liouvillian, operator_to_vector
+from scipy.integrate import solve_ivp
+
+from qupid_group_dynamics import two_partner_model
+from qupid_solvers import resolve_solver, secular_grouping, secular_jump_operators, solve
+from qupid_time_dependent_floquet import calculate_hybrid_score, compute_trajectory_metrics
+
+PARAM_KEYS = [
+    "omega_A",
+    "omega_B",
+    "J_empathy",
+    "J_compatability",
+    "drive_amplitude",
+    "drive_freq",
+    "rate_bit_flip_A",
+    "rate_dephase_A",
+    "rate_decay_A",
+    "rate_bit_flip_B",
+    "rate_dephase_B",
+    "rate_decay_B",
+    "rate_anti_corr",
+    "rate_coll_decay",
+]
+DIFFERENTIABLE_METRICS = [
+    "avg_happiness_A",
+    "avg_happiness_B",
+    "avg_happiness",
+    "correlation",
+    "slope_A",
+    "slope_B",
+    "avg_slope",
+    "volatility_A",
+    "volatility_B",
+    "volatility",
+    "spread",
+]
+GENERATOR_STEP = 1e-6
+
+
+def _generators(args, grouping=None):
+    model = two_partner_model(args)
+    L0 = liouvillian(model["H_static"], secular_jump_operators(model, grouping)).full()
+    L1 = liouvillian(model["H_drive"]).full()
+    return model, L0, L1
+
+
+def _generator_derivatives(args, model, L0, L1):
+    """
+    ∂L0/∂θ and ∂L1/∂θ per parameter, scaled so that ∂M/∂θ = T (dL0 + sin dL1)
+    also holds for the drive frequency (where ∂M/∂w = -M / w). Both sides of
+    each difference use the secular grouping of `model`.
+    """
+    grouping = secular_grouping(model)
+    dL0 = np.zeros((len(PARAM_KEYS),) + L0.shape, dtype=complex)
+    dL1 = np.zeros_like(dL0)
+    for i, key in enumerate(PARAM_KEYS):
+        value = float(args.get(key, 0.0))
+        if key == "drive_freq":
+            dL0[i], dL1[i] = -L0 / value, -L1 / value
+            continue
+        # One-sided at zero: a switched-off channel is dropped, not made negative.
+        lo = value - GENERATOR_STEP if value >= GENERATOR_STEP else value
+        hi = value + GENERATOR_STEP
+        _, L0_hi, L1_hi = _generators({**args, key: hi}, grouping)
+        _, L0_lo, L1_lo = _generators({**args, key: lo}, grouping)
+        dL0[i] = (L0_hi - L0_lo) / (hi - lo)
+        dL1[i] = (L1_hi - L1_lo) / (hi - lo)
+    return dL0, dL1
+
+
+def _tangent_mean(x, dx):
+    return x.mean(), dx.mean(axis=-1)
+
+
+def _tangent_std(x, dx):
+    centered = x - x.mean()
+    std = np.sqrt(np.mean(centered ** 2))
+    if std == 0:
+        return 0.0, np.zeros(dx.shape[0])
+    return std, np.mean(centered * dx, axis=-1) / std
+
+
+def _tangent_slope(t, dt, y, dy):
+    tc = t - t.mean()
+    dtc = dt - dt.mean(axis=-1, keepdims=True)
+    stt = np.sum(tc ** 2)
+    slope = np.sum(tc * y) / stt
+    dslope = (np.sum(dtc * y, axis=-1) + np.sum(tc * dy, axis=-1)) / stt - slope * 2 * np.sum(tc * dtc, axis=-1) / stt
+    return slope, dslope
+
+
+def _tangent_correlation(A, dA, B, dB):
+    sA, dsA = _tangent_std(A, dA)
+    sB, dsB = _tangent_std(B, dB)
+    if sA == 0 or sB == 0:
+        return 0.0, np.zeros(dA.shape[0])
+    Ac, Bc = A - A.mean(), B - B.mean()
+    cov = np.mean(Ac * Bc)
+    dcov = np.mean(dA * Bc + Ac * dB, axis=-1)
+    r = cov / (sA * sB)
+    return r, dcov / (sA * sB) - r * (dsA / sA + dsB / sB)
+
+
+def score_tangents(times, dtimes, A, dA, B, dB, final_rho, dfinal_rho, dims):
+    """
+    Derivatives of calculate_hybrid_score and the differentiable
+    compute_trajectory_metrics entries. d* arrays carry a leading parameter axis;
+    final_rho is a dense matrix in the computational basis.
+    """
+    metrics = {}
+    avg_A, metrics["avg_happiness_A"] = _tangent_mean(A, dA)
+    avg_B, metrics["avg_happiness_B"] = _tangent_mean(B, dB)
+    metrics["avg_happiness"] = (metrics["avg_happiness_A"] + metrics["avg_happiness_B"]) / 2
+    r, metrics["correlation"] = _tangent_correlation(A, dA, B, dB)
+    slope_A, metrics["slope_A"] = _tangent_slope(times, dtimes, A, dA)
+    slope_B, metrics["slope_B"] = _tangent_slope(times, dtimes, B, dB)
+    metrics["avg_slope"] = (metrics["slope_A"] + metrics["slope_B"]) / 2
+    std_A, metrics["volatility_A"] = _tangent_std(A, dA)
+    std_B, metrics["volatility_B"] = _tangent_std(B, dB)
+    metrics["volatility"] = (metrics["volatility_A"] + metrics["volatility_B"]) / 2
+    metrics["spread"] = np.mean(np.sign(A - B) * (dA - dB), axis=-1)
+
+    avg_slope = (slope_A + slope_B) / 2
+    volatility = (std_A + std_B) / 2
+    stability = np.exp(-1.6 * np.clip(volatility, 0.0, 1.5)) * 100.0
+    d_trajectory = (
+        0.45 * 50.0 * metrics["avg_happiness"]
+        + 0.2 * 50.0 * metrics["correlation"]
+        + 0.2 * (-1.6 * stability * metrics["volatility"] if 0.0 < volatility < 1.5 else 0.0)
+        + 0.15 * 300.0 * (1 - np.tanh(avg_slope * 6) ** 2) * metrics["avg_slope"]
+    )
+    # Final-state score: 70% overlap with |00>, 30% purity.
+    d_final = 100.0 * (0.7 * dfinal_rho[:, 0, 0].real + 0.3 * 2 * np.einsum("ij,pji->p", final_rho, dfinal_rho).real)
+    d_hybrid = 0.7 * d_trajectory + 0.3 * d_final
+
+    score = calculate_hybrid_score(times, A, B, Qobj(final_rho, dims=dims))
+    h = score / 100.0
+    # score = 100 * clip(hybrid / 100)^0.85, so dscore = 0.85 h^(-0.15) dhybrid inside the clip.
+    hybrid_fraction = h ** (1 / 0.85)
+    d_score = 0.85 * hybrid_fraction ** (-0.15) * d_hybrid if 0.0 < hybrid_fraction < 1.0 else np.zeros_like(d_hybrid)
+    return score, d_score, metrics
+
+
+def tangent_linear_solve(args, n_periods=10, n_steps=200):
+    """
+    One augmented solve. Returns (model, tlist, dtlist, rho, drho): the time
+    grid, states and their parameter derivatives (leading axis PARAM_KEYS).
+    """
+    model, L0, L1 = _generators(args)
+    dL0, dL1 = _generator_derivatives(args, model, L0, L1)
+    T = model["T"]
+    d = model["H_static"].shape[0]
+    P = len(PARAM_KEYS)
+    taus = np.linspace(0.0, n_periods, n_steps)
+
+    def rhs(tau, y):
+        Y = y.reshape(P + 1, d * d)
+        s = np.sin(2 * np.pi * tau)
+        M = T * (L0 + s * L1)
+        out = Y @ M.T
+        out[1:] += T * ((dL0 + s * dL1) @ Y[0])
+        return out.ravel()
+
+    y0 = np.zeros((P + 1, d * d), dtype=complex)
+    y0[0] = operator_to_vector(ket2dm(model["psi0"])).full().ravel()
+    sol = solve_ivp(rhs, (0.0, n_periods), y0.ravel(), method="DOP853", t_eval=taus, rtol=1e-8, atol=1e-10)
+    if not sol.success:
+        raise RuntimeError(f"tangent-linear solve failed: {sol.message}")
+
+    # Column-stacked vectors, as qutip's operator_to_vector.
+    Y = sol.y.T.reshape(n_steps, P + 1, d, d).transpose(0, 1, 3, 2)
+    rho = Y[:, 0]
+    drho = np.moveaxis(Y[:, 1:], 1, 0)
+    tlist = taus * T
+    dtlist = np.zeros((P, n_steps))
+    dtlist[PARAM_KEYS.index("drive_freq")] = -tlist / model["drive_freq"]
+    return model, tlist, dtlist, rho, drho
+
+
+def tangent_linear_sensitivities(args, n_periods=10, n_steps=200):
+    """
+    ∂health_score/∂θ and ∂metric/∂θ for every simulation argument, plus the
+    nominal score and metrics, of the `lindblad` formulation in one solve.
+    """
+    model, tlist, dtlist, rho, drho = tangent_linear_solve(args, n_periods, n_steps)
+    sz_A, sz_B = (op.full() for op in model["sz"])
+    A = np.einsum("ij,tji->t", sz_A, rho).real
+    B = np.einsum("ij,tji->t", sz_B, rho).real
+    dA = np.einsum("ij,ptji->pt", sz_A, drho).real
+    dB = np.einsum("ij,ptji->pt", sz_B, drho).real
+
+    score, d_score, d_metrics = score_tangents(
+        tlist, dtlist, A, dA, B, dB, rho[-1], drho[:, -1], model["H_static"].dims
+    )
+    return {
+        "health_score": float(score),
+        "trajectory_metrics": compute_trajectory_metrics(tlist, A, B),
+        "d_health_score": dict(zip(PARAM_KEYS, map(float, d_score))),
+        "d_metrics": {name: dict(zip(PARAM_KEYS, map(float, values))) for name, values in d_metrics.items()},
+    }
+
+
+def sensitivities(args, n_periods=10, n_steps=200):
+    """
+    Derivatives of the health score and metrics for the backend /run picks for
+    `args` (its "solver" field, auto by default), with that backend's nominal
+    score and metrics and a "solver" block naming it, its error estimate and
+    the method: "tangent_linear" for lindblad, "finite_difference" otherwise.
+    """
+    backend, error = resolve_solver(two_partner_model(args), args.get("solver"))
+    if backend.name == "lindblad":
+        result = tangent_linear_sensitivities(args, n_periods, n_steps)
+        method = "tangent_linear"
+    else:
+        score, metrics = _solver_score(args, backend.name, n_periods, n_steps)
+        result = {
+            "health_score": float(score),
+            "trajectory_metrics": metrics,
+            **finite_difference_sensitivities(args, n_periods=n_periods, n_steps=n_steps, solver=backend.name),
+        }
+        method = "finite_difference"
+    result["solver"] = {"solver": backend.name, "error_estimate": float(error), "method": method}
+    return result
+
+
+def _solver_score(args, solver, n_periods, n_steps):
+    model = two_partner_model(args)
+    tlist, states, _ = solve(model, n_periods, n_steps, solver=solver)
+    sz_A, sz_B = model["sz"]
+    A = np.array([(sz_A * rho).tr().real for rho in states])
+    B = np.array([(sz_B * rho).tr().real for rho in states])
+    return calculate_hybrid_score(tlist, A, B, states[-1]), compute_trajectory_metrics(tlist, A, B)
+
+
+def finite_difference_sensitivities(args, step=1e-4, n_periods=10, n_steps=200, solver="lindblad"):
+    """
+    Central differences of full solves with the named backend (two per
+    parameter). Same keys as sensitivities()' d_health_score / d_metrics.
+    """
+    d_score = {}
+    d_metrics = {name: {} for name in DIFFERENTIABLE_METRICS}
+    for key in PARAM_KEYS:
+        value = float(args.get(key, 0.0))
+        lo = value - step if value >= step else value
+        hi = value + step
+        score_hi, metrics_hi = _solver_score({**args, key: hi}, solver, n_periods, n_steps)
+        score_lo, metrics_lo = _solver_score({**args, key: lo}, solver, n_periods, n_steps)
+        d_score[key] = (score_hi - score_lo) / (hi - lo)
+        for name in DIFFERENTIABLE_METRICS:
+            d_metrics[name][key] = (metrics_hi[name] - metrics_lo[name]) / (hi - lo)
+    return {"d_health_score": d_score, "d_metrics": d_metrics}
+
+
+def compare_with_finite_differences(args, step=1e-4):
+    """
+    Largest absolute and relative disagreement between the tangent-linear and
+    finite-difference derivatives, for the score and each metric.
+    """
+    analytic = tangent_linear_sensitivities(args)
+    numeric = finite_difference_sensitivities(args, step)
+    rows = {"health_score": (analytic["d_health_score"], numeric["d_health_score"])}
+    for name in DIFFERENTIABLE_METRICS:
+        rows[name] = (analytic["d_metrics"][name], numeric["d_metrics"][name])
+    report = {}
+    for name, (a, n) in rows.items():
+        a_vec = np.array([a[k] for k in PARAM_KEYS])
+        n_vec = np.array([n[k] for k in PARAM_KEYS])
+        err = np.abs(a_vec - n_vec)
+        report[name] = {
+            "max_abs_error": float(err.max()),
+            "max_rel_error": float(err.max() / max(np.abs(n_vec).max(), 1e-12)),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    defaults = {
+        "omega_A": 0.5, "omega_B": 0.7, "J_empathy": 0.4, "J_compatability": 0.3,
+        "drive_amplitude": 0.2, "drive_freq": 0.6,
+        "rate_bit_flip_A": 0.2, "rate_dephase_A": 0.3, "rate_decay_A": 0.1,
+        "rate_bit_flip_B": 0.2, "rate_dephase_B": 0.3, "rate_decay_B": 0.1,
+        "rate_anti_corr": 0.5, "rate_coll_decay": 0.1,
+    }
+    for name, row in compare_with_finite_differences(defaults).items():
+        print(f"{name:<18}abs {row['max_abs_error']:.2e}  rel {row['max_rel_error']:.2e}")
@@ -0,0 +1,358 @@
+"""
+Interchangeable solvers for the group model. Every backend evolves the same
+model (built by qupid_group_dynamics) with the same dissipator as the
+Floquet-Markov path: the same channels and noise spectra. They differ
+in how much of the drive they treat exactly. solve() picks the cheapest backend
+whose estimated error is within tolerance.
+`python qupid_solvers.py` compares the backends against Floquet-Markov.
+"""
+import math
+import os
+import time
+
+import numpy as np
+from qutip import Qobj, expect, mesolve
+
+from qupid_group_dynamics import (
+    IntegrationError,
+    clear_floquet_caches,
+    evolve_floquet_markov,
+    floquet_channel_indices,
+    model_hamiltonian,
+    two_partner_model,
+)
+
+# Estimated worst-case error in ⟨σz⟩ (squared perturbative mixing) a cheaper
+# backend may have before the selector falls back to a more exact one.
+SOLVER_TOLERANCE = float(os.environ.get("QUPID_SOLVER_TOLERANCE", "0.01"))
+DEFAULT_SOLVER = os.environ.get("QUPID_SOLVER", "auto")
+
+# Runtime model behind the selector's ordering: cold single-core seconds for 10
+# periods, power laws fitted (within about 2x) to `python qupid_solvers.py` runs
+# of 2-6 partners. Floquet-Markov grows with the Hilbert dimension d (one
+# propagator per basis state) and weakly with the channels in its rates. The
+# mesolve backends grow with the number of secular jump operators and with d, and
+# with the drive strength. So the mesolve backends lead for couples but fall
+# behind Floquet-Markov from about 4 partners with every channel on.
+FLOQUET_SECONDS = (0.093, 1.06, 0.11)  # coefficient, exponent of d, exponent of channels
+MESOLVE_SECONDS = (0.00137, 0.89, 0.73)  # coefficient, exponent of jump operators, exponent of d
+MESOLVE_DRIVE_FACTOR = 0.5
+
+
+def _mesolve(*args, **kwargs):
+    # qutip reports a failed integration as a bare Exception.
+    try:
+        return mesolve(*args, **kwargs)
+    except Exception as exc:
+        if str(exc).startswith("ODE integration error"):
+            raise IntegrationError(str(exc)) from exc
+        raise
+
+
+def _charges(model):
+    # Total σz of each computational basis state; every term in H_static conserves it.
+    return np.real(np.diag(sum(op.full() for op in model["sz"])))
+
+
+def _static_eigenbasis(model):
+    """
+    Eigenvalues and eigenvectors of H_static, diagonalized per total-σz sector
+    so each eigenvector has a definite charge even under degeneracy.
+    """
+    H = model["H_static"].full()
+    charges = _charges(model)
+    energies = np.zeros(len(charges))
+    vectors = np.zeros(H.shape, dtype=complex)
+    for q in np.unique(charges):
+        idx = np.flatnonzero(charges == q)
+        values, vecs = np.linalg.eigh(H[np.ix_(idx, idx)])
+        energies[idx] = values
+        vectors[np.ix_(idx, idx)] = vecs
+    return energies, vectors, charges
+
+
+def secular_grouping(model):
+    """
+    Which H_static eigenstate transitions a -> b share a secular jump operator:
+    {channel: [(ω, [(b, a), ...]), ...]}, grouped by released energy ω and charge
+    change over every transition pair, allowed or not. Passing it back to
+    secular_jump_operators keeps the grouping fixed while parameters move, which
+    is what a derivative through a degenerate transition needs.
+    """
+    energies, _, charges = _static_eigenbasis(model)
+    grouping = {}
+    for c in floquet_channel_indices(model, include_off=True):
+        groups = {}
+        for b in range(len(energies)):
+            for a in range(len(energies)):
+                omega = round(float(energies[a] - energies[b]), 9)
+                groups.setdefault((omega, charges[b] - charges[a]), []).append((b, a))
+        grouping[c] = [(omega, pairs) for (omega, _), pairs in groups.items()]
+    return grouping
+
+
+def secular_jump_operators(model, grouping=None):
+    """
+    Weak-drive limit of the Floquet-Markov dissipator: each channel that enters
+    the Floquet rates is split into its H_static transition components, with
+    rate 2π S(ω) for energy-lowering transitions (half that at ω = 0, zero for
+    raising), like the Floquet rates. With a fixed `grouping` (see
+    secular_grouping), each group's ω is the mean of its members' and its
+    energy-lowering weight is that of the grouping.
+    """
+    energies, vectors, charges = _static_eigenbasis(model)
+    dims = model["H_static"].dims
+    jump_ops = []
+    for c in floquet_channel_indices(model) if grouping is None else grouping:
+        spectrum = model["spectra"][c]
+        C = vectors.conj().T @ model["c_ops"][c].full() @ vectors
+
+        if grouping is None:
+            groups = {}
+            for b, a in zip(*np.nonzero(np.abs(C) > 1e-12)):
+                # C[b, a] moves a -> b, releasing energy ω.
+                omega = round(float(energies[a] - energies[b]), 9)
+                key = (omega, charges[b] - charges[a])
+                groups.setdefault(key, np.zeros_like(C))[b, a] = C[b, a]
+            components = [(omega, omega, component) for (omega, _), component in groups.items()]
+        else:
+            components = []
+            for weight_omega, pairs in grouping[c]:
+                component = np.zeros_like(C)
+                rows, cols = zip(*pairs)
+                component[rows, cols] = C[rows, cols]
+                omega = float(np.mean([energies[a] - energies[b] for b, a in pairs]))
+                components.append((weight_omega, omega, component))
+
+        for weight_omega, omega, component in components:
+            weight = 1.0 if weight_omega > 0 else 0.5 if weight_omega == 0 else 0.0
+            gamma = weight * 2 * np.pi * float(np.asarray(spectrum(np.array([omega])))[0])
+            if gamma > 0 and np.any(component):
+                jump_ops.append(Qobj(np.sqrt(gamma) * (vectors @ component @ vectors.conj().T), dims=dims))
+    return jump_ops
+
+
+def _secular_jump_count(model):
+    """
+    How many jump operators secular_jump_operators would build, without building them.
+    """
+    energies, vectors, charges = _static_eigenbasis(model)
+    omegas = np.round(energies[None, :] - energies[:, None], 9)
+    dq = charges[:, None] - charges[None, :]
+    count = 0
+    for c in floquet_channel_indices(model):
+        C = vectors.conj().T @ model["c_ops"][c].full() @ vectors
+        allowed = (np.abs(C) > 1e-12) & (omegas >= 0)
+        count += len(set(zip(omegas[allowed], dq[allowed])))
+    return count
+
+
+def _mesolve_seconds(model, overhead):
+    coefficient, jump_exponent, dim_exponent = MESOLVE_SECONDS
+    d = model["H_static"].shape[0]
+    jumps = max(_secular_jump_count(model), 1)
+    seconds = coefficient * jumps ** jump_exponent * d ** dim_exponent
+    return overhead + seconds * (1 + MESOLVE_DRIVE_FACTOR * model["drive_amplitude"])
+
+
+def _drive_mixing(model):
+    """
+    Largest first-order admixture the drive causes between H_static eigenstates,
+    A|<a|X|b>| / |ΔE ∓ w|; its square estimates the error of a static dissipator.
+    """
+    if model["drive_amplitude"] == 0:
+        return 0.0
+    energies, vectors, _ = _static_eigenbasis(model)
+    D = np.abs(vectors.conj().T @ model["H_drive"].full() @ vectors)
+    gaps = energies[:, None] - energies[None, :]
+    w = model["drive_freq"]
+    detuning = np.minimum(np.abs(gaps - w), np.abs(gaps + w))
+    coupled = D > 1e-12
+    if np.any(detuning[coupled] < 1e-12):
+        return np.inf
+    return float(np.max(D[coupled] / detuning[coupled])) if np.any(coupled) else 0.0
+
+
+class FloquetMarkovSolver:
+    """
+    Full Floquet-Markov evolution. Exact in the drive; the reference backend.
+    """
+
+    name = "floquet_markov"
+
+    def cost(self, model):
+        coefficient, dim_exponent, channel_exponent = FLOQUET_SECONDS
+        d = model["H_static"].shape[0]
+        channels = max(len(floquet_channel_indices(model)), 1)
+        return coefficient * d ** dim_exponent * channels ** channel_exponent
+
+    def error_estimate(self, model):
+        return 0.0
+
+    def evolve(self, model, n_periods, n_steps, start=None):
+        return evolve_floquet_markov(model, n_periods, n_steps, start)
+
+
+class LindbladSolver:
+    """
+    Time-dependent mesolve: exact coherent drive, with the Floquet dissipator
+    replaced by its static-eigenbasis (weak-drive) limit.
+    """
+
+    name = "lindblad"
+    overhead_seconds = 0.0
+
+    def cost(self, model):
+        return _mesolve_seconds(model, self.overhead_seconds)
+
+    def error_estimate(self, model):
+        return _drive_mixing(model) ** 2
+
+    def evolve(self, model, n_periods, n_steps, start=None):
+        t0 = float(start["t"]) if start else 0.0
+        tlist = np.linspace(t0, t0 + n_periods * model["T"], n_steps)
+        output = _mesolve(
+            model_hamiltonian(model, math.ceil(t0 / model["T"] + n_periods)),
+            start["rho"] if start else model["psi0"],
+            tlist,
+            secular_jump_operators(model),
+            [],
+            args=model["args"],
+        )
+        return tlist, list(output.states)
+
+
+class RotatingFrameSolver:
+    """
+    Time-independent Lindblad problem in the frame rotating at w/2 about total
+    σz, keeping only the co-rotating half of the drive (RWA). States are rotated
+    back to the lab frame.
+    """
+
+    name = "rotating_frame"
+    # Time-independent, but building H_rot and rotating the states back costs
+    # about as much as the drive callbacks it saves.
+    overhead_seconds = 0.04
+
+    def cost(self, model):
+        return _mesolve_seconds(model, self.overhead_seconds)
+
+    def error_estimate(self, model):
+        # Counter-rotating terms have amplitude A/2 at frequency 2|ω_k| + w.
+        dim = model["H_static"].shape[0]
+        omegas = [abs(np.real((model["H_static"] * op).tr())) / dim for op in model["sz"]]
+        counter = (model["drive_amplitude"] / 2) / (2 * min(omegas) + model["drive_freq"])
+        return max(_drive_mixing(model) ** 2, counter ** 2)
+
+    def evolve(self, model, n_periods, n_steps, start=None):
+        w = model["drive_freq"]
+        charges = _charges(model)
+        dims = model["H_static"].dims
+        delta_q = charges[:, None] - charges[None, :]
+        D = model["H_drive"].full()
+        raising = np.where(charges[:, None] > charges[None, :], D, 0)
+        H_rot = (
+            model["H_static"].full()
+            - (w / 2) * np.diag(charges)
+            + 0.5j * (raising - raising.conj().T)
+        )
+        t0 = float(start["t"]) if start else 0.0
+        tlist = np.linspace(t0, t0 + n_periods * model["T"], n_steps)
+        rho0 = model["psi0"]
+        if start:
+            rho0 = Qobj(start["rho"].full() * np.exp(0.5j * w * t0 * delta_q), dims=dims)
+        output = _mesolve(Qobj(H_rot, dims=dims), rho0, tlist, secular_jump_operators(model), [])
+
+        states = []
+        for t, rho in zip(tlist, output.states):
+            rho = rho.full() if rho.isoper else (rho * rho.dag()).full()
+            states.append(Qobj(rho * np.exp(-0.5j * w * t * delta_q), dims=dims))
+        return tlist, states
+
+
+SOLVERS = {solver.name: solver for solver in (RotatingFrameSolver(), LindbladSolver(), FloquetMarkovSolver())}
+
+
+def select_solver(model, tolerance=None):
+    """
+    The cheapest backend, by its estimated runtime for this model, whose error
+    estimate is within tolerance.
+    """
+    tolerance = SOLVER_TOLERANCE if tolerance is None else tolerance
+    for solver in sorted(SOLVERS.values(), key=lambda s: s.cost(model)):
+        error = solver.error_estimate(model)
+        if error <= tolerance:
+            return solver, error
+    return SOLVERS["floquet_markov"], 0.0
+
+
+def resolve_solver(model, solver=None, tolerance=None):
+    """
+    The backend solve() runs for `solver` ("auto" selects one), with its error estimate.
+    """
+    requested = solver or DEFAULT_SOLVER
+    if requested == "auto":
+        return select_solver(model, tolerance)
+    if requested in SOLVERS:
+        return SOLVERS[requested], SOLVERS[requested].error_estimate(model)
+    raise ValueError(f"unknown solver {requested!r}; expected auto or one of {sorted(SOLVERS)}")
+
+
+def solve(model, n_periods=10, n_steps=200, solver=None, tolerance=None, start=None):
+    """
+    Evolves `model` with the named backend ("auto" selects one), from its
+    initial state or from a `start` state (see evolve_floquet_markov). Returns
+    (tlist, lab-frame states, info) where info names the backend and its runtime.
+    """
+    requested = solver or DEFAULT_SOLVER
+    backend, error = resolve_solver(model, requested, tolerance)
+
+    started = time.perf_counter()
+    tlist, states = backend.evolve(model, n_periods, n_steps, start)
+    return tlist, states, {
+        "solver": backend.name,
+        "requested": requested,
+        "error_estimate": float(error),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def compare_solvers(model, n_periods=10, n_steps=200):
+    """
+    Runs every backend on `model`, cold, and reports its runtime next to the
+    runtime model's prediction, its error estimate and its actual max |Δ⟨σz⟩|
+    against Floquet-Markov.
+    """
+    results = {}
+    for name, backend in SOLVERS.items():
+        clear_floquet_caches()
+        tlist, states, info = solve(model, n_periods, n_steps, solver=name)
+        info["predicted_seconds"] = backend.cost(model)
+        results[name] = (info, np.array([[expect(op, rho) for rho in states] for op in model["sz"]]))
+    reference = results["floquet_markov"][1]
+    return {
+        name: {**info, "max_sz_error": float(np.max(np.abs(sz - reference)))}
+        for name, (info, sz) in results.items()
+    }
+
+
+def _print_comparison(label, model):
+    for name, row in compare_solvers(model).items():
+        print(
+            f"{label:>14}{name:>16}{row['seconds']:>10.3f}{row['predicted_seconds']:>11.3f}"
+            f"{row['error_estimate']:>11.2e}{row['max_sz_error']:>10.2e}"
+        )
+
+
+if __name__ == "__main__":
+    from qupid_group_dynamics import build_group_model
+
+    print(f"{'model':>14}{'backend':>16}{'seconds':>10}{'predicted':>11}{'estimate':>11}{'actual':>10}")
+    for amplitude in (0.05, 0.2, 0.5, 1.5):
+        _print_comparison(f"drive {amplitude:.2f}", two_partner_model({"drive_amplitude": amplitude}))
+    # Groups with every channel on, where the mesolve backends lose their lead.
+    for n in range(2, 6):
+        people = [{"omega": 0.5 + 0.1 * k} for k in range(n)]
+        edges = [{"i": k, "j": k + 1} for k in range(n - 1)]
+        model = build_group_model(people, edges, drive_amplitude=0.5, drive_freq=0.6, noise_channels="all")
+        _print_comparison(f"{n} partners", model)
@@ -8,6 +8,11 @@ from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 import qutip as qt
 from qutip import *
 
+from qupid_checkpoints import STEPS_PER_PERIOD, extension_periods, make_checkpoint, params_hash, read_checkpoint
+from qupid_group_dynamics import build_group_model, two_partner_model
+from qupid_rhythm import solve_envelope
+from qupid_solvers import solve
+
 def calculate_health_score(final_rho):
     """
     Calculates a 0-100 score based on Purity and 'Ideal State' overlap.
@@ -205,116 +210,105 @@ def compute_trajectory_metrics(times, data_A, data_B):
         "spread": float(spread),
     }
 
-def run_simulation(params=None, render_plot=True):
-    params = params or {}
-
-    # --- 1. Define The Operators ---
-    I = qeye(2)
-
-    # Acts on A, leaves B alone
-    sx_A = tensor(sigmax(), I)  # Hot/Cold Partner, Bit flip A
-    sz_A = tensor(sigmaz(), I)  # Cold shoulder partner, Dephase A
-    sm_A = tensor(sigmam(), I)  # Burnt out partner, Decay A
-
-    # Leaves A alone, acts on B
-    sx_B = tensor(I, sigmax())
-    sz_B = tensor(I, sigmaz())
-    sm_B = tensor(I, sigmam())
-
-    # Things that affect BOTH simultaneously
-    sz_A_B = tensor(sigmaz(), sigmaz())  # Growing apart partners, Anti-correlated Dephase A/B
-    sm_A_B = tensor(sigmam(), sigmam()) # Codepedent downward spiral partners, Collective Decay A/B
-
-    # Creates the "Swap" interaction
-    sy_A = tensor(sigmay(), I)
-    sy_B = tensor(I, sigmay())
-
-    # --- 2. Define Parameters ---
-    omega_A = float(params.get("omega_A", 1.0))
-    omega_B = float(params.get("omega_B", 1.4))
-    J_empathy = float(params.get("J_empathy", 0.1))
-    J_compatibility = float(
-        params.get("J_compatibility", params.get("J_compatability", 0.05))
-    )
-    drive_amplitude = float(params.get("drive_amplitude", 1.5))
-    drive_freq = float(params.get("drive_freq", 1.0))
-    T = (2 * np.pi) / drive_freq
-
-    args = {"w": drive_freq}
-
-    # --- 3. Construct the Time-Dependent Hamiltonian ---
-    H_static = (omega_A * sz_A) + (omega_B * sz_B) + \
-               J_empathy * (sx_A * sx_B + sy_A * sy_B) + \
-               J_compatibility * (sz_A * sz_B)
-
-    H_driving_op = drive_amplitude * (sx_A + sx_B)
-    H = [H_static, [H_driving_op, lambda t, args: np.sin(args["w"] * t)]]
-
-    # --- 4. Define Noise Spectra ---
-    def make_spectrum(rate):
-        def spectrum(w):
-            return rate / (2 * np.pi)
-        return spectrum
-
-    rate_bit_flip_A = float(params.get("rate_bit_flip_A", 0.05))
-    rate_dephase_A = float(params.get("rate_dephase_A", 0.2))
-    rate_decay_A = float(params.get("rate_decay_A", 0.01))
-
-    rate_bit_flip_B = float(params.get("rate_bit_flip_B", 0.01))
-    rate_dephase_B = float(params.get("rate_dephase_B", 0.05))
-    rate_decay_B = float(params.get("rate_decay_B", 0.1))
-
-    rate_anti_corr = float(params.get("rate_anti_corr", 0.9))
-    rate_coll_decay = float(params.get("rate_coll_decay", 0.02))
 
-    c_ops_list = []
-    spectra_list = []
+def compact_trajectory(times, data_A, data_B, points=50):
+    """
+    The ⟨σz⟩ trajectories resampled onto `points` evenly spaced times, for storage.
+    """
+    grid = np.linspace(times[0], times[-1], points)
+    return {
+        "t": np.round(grid, 4).tolist(),
+        "A": np.round(np.interp(grid, times, data_A), 4).tolist(),
+        "B": np.round(np.interp(grid, times, data_B), 4).tolist(),
+    }
 
-    c_ops_list.append(sx_A); spectra_list.append(make_spectrum(rate_bit_flip_A))
-    c_ops_list.append(sz_A); spectra_list.append(make_spectrum(rate_dephase_A))
-    c_ops_list.append(sm_A); spectra_list.append(make_spectrum(rate_decay_A))
+SOLVER_TITLES = {
+    "floquet_markov": "Floquet-Markov",
+    "lindblad": "Lindblad",
+    "rotating_frame": "Rotating-Frame Lindblad",
+    "envelope": "Piecewise Propagators",
+}
+GROUP_COLORS = ["#00FFFF", "#FF00FF", "#FFD700", "#7CFC00", "#FF7F50", "#9370DB", "#FF69B4", "#40E0D0"]
 
-    c_ops_list.append(sx_B); spectra_list.append(make_spectrum(rate_bit_flip_B))
-    c_ops_list.append(sz_B); spectra_list.append(make_spectrum(rate_dephase_B))
-    c_ops_list.append(sm_B); spectra_list.append(make_spectrum(rate_decay_B))
 
-    c_ops_list.append(sz_A_B); spectra_list.append(make_spectrum(rate_anti_corr))
-    c_ops_list.append(sm_A_B); spectra_list.append(make_spectrum(rate_coll_decay))
+def render_trajectory_plot(tlist, series, title):
+    """
+    Renders (label, data, color) series as a base64 PNG.
+    """
+    plt.close("all")
+    plt.style.use("dark_background")
+    fig, ax = plt.subplots(figsize=(10, 6))
+    FigureCanvas(fig)
+    for label, data, color in series:
+        ax.plot(tlist, data, label=label, color=color, linewidth=2)
+    ax.axhline(0, color="white", linestyle=":", alpha=0.5)
+    ax.set_title(title)
+    ax.legend(loc="upper right")
+    ax.set_ylim(-1.1, 1.1)
+    fig.canvas.draw()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=160, bbox_inches="tight")
+    buffer.seek(0)
+    plot_b64 = base64.b64encode(buffer.read()).decode("utf-8")
+    plt.close(fig)
+    return plot_b64
+
+
+def solve_couple(params=None):
+    """
+    Evolves the A/B couple with the solver named by params["solver"] (default:
+    auto-selected), or under params["drive_envelope"] (see qupid_rhythm) in place
+    of the periodic drive. With params["checkpoint"] (see qupid_checkpoints) only
+    params["extend_periods"] more periods are solved, from the checkpointed state,
+    and stitched onto its trajectory.
+    Returns (tlist, happiness_A, happiness_B, final_rho_lab, solver_info).
+    """
+    params = params or {}
+    # --- 1-4. Operators, Hamiltonian and noise channels (A/B as a 2-partner group) ---
+    model = two_partner_model(params)
+    sz_A, sz_B = model["sz"]
+
+    # --- 5-6. Evolution from |00> over 10 drive periods, or over the message timeline ---
+    if params.get("checkpoint"):
+        if params.get("drive_envelope"):
+            raise ValueError("a rhythm drive cannot be resumed from a checkpoint")
+        start, previous, previous_hash = read_checkpoint(params["checkpoint"], model)
+        n_periods = extension_periods(params.get("extend_periods"))
+        n_steps = max(2, int(round(n_periods * STEPS_PER_PERIOD)))
+        tlist, states, solver_info = solve(model, n_periods, n_steps, solver=params.get("solver"), start=start)
+        solver_info["resumed_from"] = start["t"]
+        solver_info["params_changed"] = previous_hash != params_hash(params)
+    elif params.get("drive_envelope"):
+        tlist, states, solver_info = solve_envelope(model, params["drive_envelope"])
+    else:
+        tlist, states, solver_info = solve(model, solver=params.get("solver"))
 
-    # --- 5. Setup Simulation ---
-    tlist = np.linspace(0.0, 10 * T, 200)
-    psi0 = tensor(basis(2, 0), basis(2, 0))
+    # --- 7. Extract Data ---
+    happiness_A = np.array([expect(sz_A, rho) for rho in states])
+    happiness_B = np.array([expect(sz_B, rho) for rho in states])
+    if params.get("checkpoint"):
+        # The segment starts at the checkpoint time, which the stored trajectory already has.
+        times, A, B = previous
+        tlist = np.concatenate([times, tlist[1:]])
+        happiness_A = np.concatenate([A, happiness_A[1:]])
+        happiness_B = np.concatenate([B, happiness_B[1:]])
+    return tlist, happiness_A, happiness_B, states[-1], solver_info
 
-    # --- 6. The Floquet-Markov Solver Flow ---
-    f_modes_0, f_energies = floquet_modes(H, T, args)
-    f_modes_table_t = floquet_modes_table(
-        f_modes_0, f_energies, np.linspace(0, T, 500 + 1), H, T, args
-    )
 
-    output = fmmesolve(
-        H, psi0, tlist,
-        c_ops_list,
-        [],
-        spectra_list,
-        T=T,
-        args=args
-    )
+def simulate_couple(params=None):
+    """
+    Evolves the A/B couple and returns (tlist, happiness_A, happiness_B, final_rho_lab)
+    without any scoring, report or plot work.
+    """
+    return solve_couple(params)[:4]
 
-    # --- 7. Transform & Extract Data ---
-    happiness_A = np.zeros(len(tlist))
-    happiness_B = np.zeros(len(tlist))
 
-    for idx, t in enumerate(tlist):
-        f_modes_t = floquet_modes_t_lookup(f_modes_table_t, t, T)
-        rho_lab = output.states[idx].transform(f_modes_t, True)
-        happiness_A[idx] = expect(sz_A, rho_lab)
-        happiness_B[idx] = expect(sz_B, rho_lab)
+def run_simulation(params=None, render_plot=True):
+    params = params or {}
+    tlist, happiness_A, happiness_B, final_rho_lab, solver_info = solve_couple(params)
 
     # --- EXECUTE ANALYSIS ---
-    final_rho_floquet = output.states[-1]
-    final_modes = floquet_modes_t_lookup(f_modes_table_t, tlist[-1], T)
-    final_rho_lab = final_rho_floquet.transform(final_modes, True)
-
     health_score = calculate_hybrid_score(tlist, happiness_A, happiness_B, final_rho_lab)
     metrics = compute_trajectory_metrics(tlist, happiness_A, happiness_B)
     report_text = generate_report(tlist, happiness_A, happiness_B, health_score)
@@ -332,33 +326,102 @@ def run_simulation(params=None, render_plot=True):
 
     plot_b64 = None
     if render_plot:
-        plt.close("all")
-        plt.style.use("dark_background")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        FigureCanvas(fig)
-        ax.plot(tlist, happiness_A, label="Person A", color="#00FFFF", linewidth=2)
-        ax.plot(tlist, happiness_B, label="Person B", color="#FF00FF", linewidth=2)
-        ax.axhline(0, color="white", linestyle=":", alpha=0.5)
-        ax.set_title("Relationship Dynamics with Periodic Effort (Floquet-Markov)")
-        ax.legend(loc="upper right")
-        ax.set_ylim(-1.1, 1.1)
-        fig.canvas.draw()
-
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format="png", dpi=160, bbox_inches="tight")
-        buffer.seek(0)
-        plot_b64 = base64.b64encode(buffer.read()).decode("utf-8")
-        plt.close(fig)
+        plot_b64 = render_trajectory_plot(
+            tlist,
+            [("Person A", happiness_A, "#00FFFF"), ("Person B", happiness_B, "#FF00FF")],
+            f"Relationship Dynamics with {'Message-Rhythm' if params.get('drive_envelope') else 'Periodic'} Effort"
+            f" ({SOLVER_TITLES[solver_info['solver']]})",
+        )
 
     return {
         "health_score": float(health_score),
         "report_text": report_text,
         "plot_base64": plot_b64,
         "trajectory_metrics": metrics,
+        "trajectory": compact_trajectory(tlist, happiness_A, happiness_B),
+        "solver": solver_info,
+        "checkpoint": None if params.get("drive_envelope") else make_checkpoint(
+            params, tlist, happiness_A, happiness_B, final_rho_lab, solver_info["solver"]
+        ),
+    }
+
+
+def run_group_simulation(group, render_plot=True):
+    """
+    Simulates an n-partner group (see qupid_group_dynamics.build_group_model).
+
+    group: {"people": [...], "edges": [...], "drive_amplitude", "drive_freq",
+    optional "names"}. Scores are computed per edge on the pair's reduced state
+    and averaged into a group health score.
+    """
+    model = build_group_model(
+        group.get("people", []),
+        group.get("edges", []),
+        drive_amplitude=group.get("drive_amplitude", 1.5),
+        drive_freq=group.get("drive_freq", 1.0),
+        noise=group.get("noise"),
+        # Every partner's and edge's noise should count, so groups sum all channels.
+        noise_channels=group.get("noise_channels") or "all",
+    )
+    n = model["n"]
+    names = list(group.get("names") or [])
+    names += [f"Person {k + 1}" for k in range(len(names), n)]
+
+    tlist, states, solver_info = solve(model, solver=group.get("solver"))
+    happiness = np.array([[expect(op, rho) for rho in states] for op in model["sz"]])
+    final_rho = states[-1]
+
+    people = []
+    for k in range(n):
+        people.append({
+            "name": names[k],
+            "avg_happiness": float(np.mean(happiness[k])),
+            "volatility": float(np.std(happiness[k])),
+            "slope": float(np.polyfit(tlist, happiness[k], 1)[0]),
+            "final_sz": float(happiness[k][-1]),
+        })
+
+    pairs = []
+    for (i, j), zz_op in zip(model["pairs"], model["sz_pairs"]):
+        zz = np.array([expect(zz_op, rho) for rho in states])
+        pair_rho = final_rho.ptrace([i, j])
+        pairs.append({
+            "pair": [i, j],
+            "names": [names[i], names[j]],
+            "health_score": calculate_hybrid_score(tlist, happiness[i], happiness[j], pair_rho),
+            "avg_sz_sz": float(np.mean(zz)),
+            "trajectory_metrics": compute_trajectory_metrics(tlist, happiness[i], happiness[j]),
+        })
+
+    health_score = float(np.mean([p["health_score"] for p in pairs])) if pairs else 0.0
+
+    plot_b64 = None
+    if render_plot:
+        plot_b64 = render_trajectory_plot(
+            tlist,
+            [(names[k], happiness[k], GROUP_COLORS[k % len(GROUP_COLORS)]) for k in range(n)],
+            f"Group Dynamics ({n} partners, {SOLVER_TITLES[solver_info['solver']]})",
+        )
+
+    return {
+        "health_score": health_score,
+        "people": people,
+        "pairs": pairs,
+        "plot_base64": plot_b64,
+        "solver": solver_info,
     }
 
 
 if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["bulk"]:
+        # Bulk NDJSON scoring: python qupid_time_dependent_floquet.py bulk in.ndjson -o out.ndjson
+        from backend.bulk import main as bulk_main
+
+        bulk_main(sys.argv[2:])
+        sys.exit(0)
+
     results = run_simulation()
     print(results["report_text"])
     if results["plot_base64"]:
@@ -0,0 +1,202 @@
+from concurrent.futures import as_completed
+
+import numpy as np
+from qutip import Options, expect, ket2dm, mcsolve, serial_map
+
+from qupid_group_dynamics import build_group_model, model_hamiltonian, two_partner_model
+from qupid_parallel import make_executor, spawn_seeds
+from qupid_time_dependent_floquet import calculate_hybrid_score, compute_trajectory_metrics
+
+DEFAULT_TRAJECTORIES = 256
+DEFAULT_BATCH_SIZE = 32
+MAX_TRAJECTORIES = 20000
+SAMPLE_JUMP_TRAJECTORIES = 3
+
+
+def build_model(spec):
+    """
+    `spec` is either run_simulation's params dict or a group spec with people/edges.
+    """
+    if "people" in spec:
+        return build_group_model(
+            spec["people"],
+            spec.get("edges", []),
+            drive_amplitude=spec.get("drive_amplitude", 1.5),
+            drive_freq=spec.get("drive_freq", 1.0),
+        )
+    return two_partner_model(spec)
+
+
+def lindblad_channels(model):
+    """
+    Collapse operators sqrt(rate) * op, skipping channels that are switched off.
+    """
+    c_ops, labels = [], []
+    for op, rate, label in zip(model["c_ops"], model["rates"], model["labels"]):
+        if rate > 0.0:
+            c_ops.append(np.sqrt(rate) * op)
+            labels.append(label)
+    return c_ops, labels
+
+
+def _per_trajectory(values, ntraj):
+    # mcsolve drops the trajectory axis when only one trajectory is run.
+    if ntraj == 1 and (len(values) == 0 or not isinstance(values[0], (list, tuple, np.ndarray))):
+        return [values]
+    return values
+
+
+def _run_batch(spec, n_periods, n_steps, seeds):
+    """
+    One worker's share of trajectories. Returns per-batch sums so batches can be
+    merged in any order, plus the raw jump records.
+    """
+    model = build_model(spec)
+    c_ops, labels = lindblad_channels(model)
+    tlist = np.linspace(0.0, n_periods * model["T"], n_steps)
+
+    output = mcsolve(
+        model_hamiltonian(model, n_periods), model["psi0"], tlist, c_ops, [],
+        ntraj=len(seeds),
+        args=model["args"],
+        options=Options(seeds=np.array(seeds)),
+        progress_bar=None,
+        map_func=serial_map,
+    )
+
+    trajectories = _per_trajectory(output.states, len(seeds))
+
+    n_people = len(model["sz"])
+    sz_sum = np.zeros((n_people, n_steps))
+    sz_sq_sum = np.zeros((n_people, n_steps))
+    final_rho_sum = None
+    for states in trajectories:
+        states = list(states)
+        values = np.array([expect(op, states) for op in model["sz"]])
+        sz_sum += values
+        sz_sq_sum += values ** 2
+        final_rho = ket2dm(states[-1])
+        final_rho_sum = final_rho if final_rho_sum is None else final_rho_sum + final_rho
+
+    jumps = []
+    col_times = _per_trajectory(output.col_times, len(seeds))
+    col_which = _per_trajectory(output.col_which, len(seeds))
+    for times, which in zip(col_times, col_which):
+        jumps.append([(float(t), labels[int(w)]) for t, w in zip(times, which)])
+
+    return {
+        "count": len(seeds),
+        "sz_sum": sz_sum,
+        "sz_sq_sum": sz_sq_sum,
+        "final_rho_sum": final_rho_sum,
+        "jumps": jumps,
+    }
+
+
+def _running_stats(batches):
+    count = sum(b["count"] for b in batches)
+    sz_sum = sum(b["sz_sum"] for b in batches)
+    sz_sq_sum = sum(b["sz_sq_sum"] for b in batches)
+    mean = sz_sum / count
+    if count > 1:
+        variance = np.clip((sz_sq_sum - count * mean ** 2) / (count - 1), 0.0, None)
+        stderr = np.sqrt(variance / count)
+    else:
+        stderr = np.zeros_like(mean)
+    return count, mean, stderr
+
+
+def _event_timeline(jump_lists, labels, tlist, n_bins=20):
+    """
+    Aggregates per-trajectory jumps into a per-channel timeline of expected
+    events per trajectory, plus a few raw sample trajectories.
+    """
+    edges = np.linspace(tlist[0], tlist[-1], n_bins + 1)
+    counts = {label: np.zeros(n_bins) for label in labels}
+    for jumps in jump_lists:
+        for t, label in jumps:
+            idx = min(int(np.searchsorted(edges, t, side="right")) - 1, n_bins - 1)
+            counts[label][max(idx, 0)] += 1
+    n_traj = max(1, len(jump_lists))
+    return {
+        "bin_edges": edges.tolist(),
+        "events_per_trajectory": {label: (c / n_traj).tolist() for label, c in counts.items()},
+        "samples": [
+            [{"t": t, "channel": label} for t, label in jumps]
+            for jumps in jump_lists[:SAMPLE_JUMP_TRAJECTORIES]
+        ],
+    }
+
+
+def run_trajectory_simulation(
+    spec,
+    ntraj=DEFAULT_TRAJECTORIES,
+    batch_size=DEFAULT_BATCH_SIZE,
+    seed=0,
+    workers=None,
+    on_progress=None,
+    n_periods=10,
+    n_steps=200,
+    cancel=None,
+):
+    """
+    Monte Carlo wavefunction unravelling of the Lindblad version of the model,
+    with trajectories fanned out across worker processes in batches.
+
+    `seed` makes the run reproducible regardless of worker count or completion
+    order. `on_progress(snapshot)` is called after each batch with the running
+    mean and standard error of ⟨σz⟩ per partner. Once the `cancel` event is
+    set, batches not yet started are dropped and RuntimeError is raised.
+    """
+    ntraj = int(min(max(1, ntraj), MAX_TRAJECTORIES))
+    batch_size = max(1, int(batch_size))
+    seeds = spawn_seeds(seed, ntraj)
+    chunks = [seeds[i : i + batch_size] for i in range(0, ntraj, batch_size)]
+
+    model = build_model(spec)
+    _, labels = lindblad_channels(model)
+    tlist = np.linspace(0.0, n_periods * model["T"], n_steps)
+
+    results = [None] * len(chunks)
+    with make_executor(workers, thread_name_prefix="qupid-mc") as pool:
+        futures = {
+            pool.submit(_run_batch, spec, n_periods, n_steps, chunk): idx
+            for idx, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            if cancel is not None and cancel.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise RuntimeError("trajectory run cancelled")
+            results[futures[future]] = future.result()
+            if on_progress is not None:
+                done = [r for r in results if r is not None]
+                count, mean, stderr = _running_stats(done)
+                on_progress({
+                    "completed": count,
+                    "total": ntraj,
+                    "mean_sz": mean.tolist(),
+                    "stderr_sz": stderr.tolist(),
+                })
+
+    # Merge in batch order so the result is bit-for-bit reproducible.
+    count, mean, stderr = _running_stats(results)
+    final_rho = results[0]["final_rho_sum"]
+    for r in results[1:]:
+        final_rho = final_rho + r["final_rho_sum"]
+    final_rho = final_rho / count
+    jump_lists = [jumps for r in results for jumps in r["jumps"]]
+
+    response = {
+        "solver": "mcsolve",
+        "ntraj": count,
+        "seed": seed,
+        "times": tlist.tolist(),
+        "mean_sz": mean.tolist(),
+        "stderr_sz": stderr.tolist(),
+        "events": _event_timeline(jump_lists, labels, tlist),
+    }
+    if model["n"] == 2:
+        response["health_score"] = calculate_hybrid_score(tlist, mean[0], mean[1], final_rho)
+        response["trajectory_metrics"] = compute_trajectory_metrics(tlist, mean[0], mean[1])
+    return response
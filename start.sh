@@ -2,7 +2,6 @@
 set -euo pipefail
 
 ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-BACKEND_DIR="$ROOT_DIR/backend"
 
 # activate the venv created during build (Render persists it between build/start on the same deploy)
 # shellcheck disable=SC1091
@@ -11,4 +10,8 @@ source "$ROOT_DIR/.venv/bin/activate"
 # IMPORTANT: bind to Render's port
 export PORT="${PORT:-5000}"
 
-exec python "$BACKEND_DIR/app.py"
+# ASGI server: WEB_CONCURRENCY hypercorn workers under a small supervisor that
+# drains in-flight work on SIGTERM (up to QUPID_GRACEFUL_TIMEOUT seconds) and
+# replaces workers that recycle themselves past QUPID_MAX_RSS_MB.
+cd "$ROOT_DIR"
+exec python -m backend.serve
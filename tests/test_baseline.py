@@ -0,0 +1,120 @@
+"""
+The Floquet-Markov couple, and the 2-partner group, against the original fmmesolve flow.
+
+baseline_couple() is the pre-refactor run_simulation, minus the report and plot:
+qutip's own fmmesolve on the hand-built two-qubit model. Scores must agree to
+SCORE_TOLERANCE points and trajectories to TRAJECTORY_TOLERANCE.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("qutip")
+
+from qutip import (
+    basis,
+    expect,
+    floquet_modes,
+    floquet_modes_t_lookup,
+    floquet_modes_table,
+    fmmesolve,
+    qeye,
+    sigmam,
+    sigmax,
+    sigmay,
+    sigmaz,
+    tensor,
+)
+
+from backend.simulation_args import build_simulation_args
+from qupid_time_dependent_floquet import calculate_hybrid_score, run_group_simulation, run_simulation
+
+SCORE_TOLERANCE = 1e-3
+# Compact trajectories are rounded to 4 decimals.
+TRAJECTORY_TOLERANCE = 2e-4
+
+SLIDERS = {
+    "personATemperarment": 50,
+    "personBTemperarment": 70,
+    "mutualEmpathy": 40,
+    "mutualCompatability": 30,
+    "mutualStrength": 20,
+    "mutualFrequency": 60,
+    "personAHotCold": 20,
+    "personADistant": 30,
+    "personABurnedOut": 10,
+    "personBHotCold": 20,
+    "personBDistant": 30,
+    "personBBurnedOut": 10,
+    "mutualSync": 50,
+    "mutualCodependence": 10,
+}
+PAYLOADS = [{}, build_simulation_args(SLIDERS)]
+
+
+def baseline_couple(params):
+    """
+    (tlist, happiness_A, happiness_B, health_score) from the original fmmesolve flow.
+    """
+    I = qeye(2)
+    sx_A, sy_A, sz_A, sm_A = (tensor(op, I) for op in (sigmax(), sigmay(), sigmaz(), sigmam()))
+    sx_B, sy_B, sz_B, sm_B = (tensor(I, op) for op in (sigmax(), sigmay(), sigmaz(), sigmam()))
+
+    drive_freq = float(params.get("drive_freq", 1.0))
+    T = 2 * np.pi / drive_freq
+    args = {"w": drive_freq}
+    H_static = (
+        float(params.get("omega_A", 1.0)) * sz_A
+        + float(params.get("omega_B", 1.4)) * sz_B
+        + float(params.get("J_empathy", 0.1)) * (sx_A * sx_B + sy_A * sy_B)
+        + float(params.get("J_compatability", 0.05)) * (sz_A * sz_B)
+    )
+    H = [H_static, [float(params.get("drive_amplitude", 1.5)) * (sx_A + sx_B), lambda t, args: np.sin(args["w"] * t)]]
+
+    channels = [
+        (sx_A, "rate_bit_flip_A", 0.05), (sz_A, "rate_dephase_A", 0.2), (sm_A, "rate_decay_A", 0.01),
+        (sx_B, "rate_bit_flip_B", 0.01), (sz_B, "rate_dephase_B", 0.05), (sm_B, "rate_decay_B", 0.1),
+        (tensor(sigmaz(), sigmaz()), "rate_anti_corr", 0.9), (tensor(sigmam(), sigmam()), "rate_coll_decay", 0.02),
+    ]
+    c_ops = [op for op, _, _ in channels]
+    spectra = [
+        (lambda rate: lambda w: rate / (2 * np.pi))(float(params.get(key, default)))
+        for _, key, default in channels
+    ]
+
+    tlist = np.linspace(0.0, 10 * T, 200)
+    f_modes_0, f_energies = floquet_modes(H, T, args)
+    f_modes_table_t = floquet_modes_table(f_modes_0, f_energies, np.linspace(0, T, 501), H, T, args)
+    output = fmmesolve(H, tensor(basis(2, 0), basis(2, 0)), tlist, c_ops, [], spectra, T=T, args=args)
+
+    states = [
+        output.states[idx].transform(floquet_modes_t_lookup(f_modes_table_t, t, T), True)
+        for idx, t in enumerate(tlist)
+    ]
+    A = np.array([expect(sz_A, rho) for rho in states])
+    B = np.array([expect(sz_B, rho) for rho in states])
+    return tlist, A, B, calculate_hybrid_score(tlist, A, B, states[-1])
+
+
+@pytest.mark.parametrize("params", PAYLOADS)
+def test_floquet_markov_run_matches_fmmesolve(params):
+    tlist, A, B, score = baseline_couple(params)
+    result = run_simulation({**params, "solver": "floquet_markov"}, render_plot=False)
+    assert result["solver"]["solver"] == "floquet_markov"
+    assert result["health_score"] == pytest.approx(score, abs=SCORE_TOLERANCE)
+    grid = np.array(result["trajectory"]["t"])
+    assert np.allclose(result["trajectory"]["A"], np.round(np.interp(grid, tlist, A), 4), atol=TRAJECTORY_TOLERANCE)
+    assert np.allclose(result["trajectory"]["B"], np.round(np.interp(grid, tlist, B), 4), atol=TRAJECTORY_TOLERANCE)
+
+
+def test_two_partner_group_matches_fmmesolve():
+    people = [
+        {"omega": 1.0, "rate_bit_flip": 0.05, "rate_dephase": 0.2, "rate_decay": 0.01},
+        {"omega": 1.4, "rate_bit_flip": 0.01, "rate_dephase": 0.05, "rate_decay": 0.1},
+    ]
+    edges = [{"i": 0, "j": 1, "J_empathy": 0.1, "J_compatibility": 0.05, "rate_anti_corr": 0.9, "rate_coll_decay": 0.02}]
+    group = {"people": people, "edges": edges, "noise_channels": "first", "solver": "floquet_markov"}
+    _, A, B, score = baseline_couple({})
+    result = run_group_simulation(group, render_plot=False)
+    assert result["pairs"][0]["health_score"] == pytest.approx(score, abs=SCORE_TOLERANCE)
+    assert result["people"][0]["avg_happiness"] == pytest.approx(np.mean(A), abs=TRAJECTORY_TOLERANCE)
+    assert result["people"][1]["avg_happiness"] == pytest.approx(np.mean(B), abs=TRAJECTORY_TOLERANCE)
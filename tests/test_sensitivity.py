@@ -0,0 +1,113 @@
+"""
+Sensitivities against central differences of full solves.
+
+Tangent-linear derivatives are checked against Lindblad solves, and
+sensitivities() against run_simulation with the backend /run picks. Each
+quantity (the health score and every differentiable metric) must agree to
+within TOLERANCE of the largest finite-difference derivative of that quantity.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("qutip")
+
+from qutip import liouvillian
+
+from backend.simulation_args import build_simulation_args
+from qupid_group_dynamics import two_partner_model
+from qupid_sensitivity import (
+    DIFFERENTIABLE_METRICS,
+    PARAM_KEYS,
+    finite_difference_sensitivities,
+    sensitivities,
+    tangent_linear_sensitivities,
+)
+from qupid_solvers import secular_grouping, secular_jump_operators
+from qupid_time_dependent_floquet import run_simulation
+
+TOLERANCE = 1e-2
+FD_STEP = 1e-4
+
+BASE_SLIDERS = {
+    "personATemperarment": 50,
+    "personBTemperarment": 70,
+    "mutualEmpathy": 40,
+    "mutualCompatability": 30,
+    "mutualStrength": 20,
+    "mutualFrequency": 60,
+    "personAHotCold": 20,
+    "personADistant": 30,
+    "personABurnedOut": 10,
+    "personBHotCold": 20,
+    "personBDistant": 30,
+    "personBBurnedOut": 10,
+    "mutualSync": 50,
+    "mutualCodependence": 10,
+}
+# Away from degenerate transitions, where finite differences of full solves are smooth.
+SLIDER_POINTS = [
+    BASE_SLIDERS,
+    {**BASE_SLIDERS, "personATemperarment": 80, "personBTemperarment": 35, "mutualStrength": 45},
+    {**BASE_SLIDERS, "mutualEmpathy": 15, "mutualCompatability": 65, "mutualFrequency": 25, "mutualSync": 80},
+]
+
+
+def _max_errors(analytic, numeric):
+    rows = {"health_score": (analytic["d_health_score"], numeric["d_health_score"])}
+    for name in DIFFERENTIABLE_METRICS:
+        rows[name] = (analytic["d_metrics"][name], numeric["d_metrics"][name])
+    errors = {}
+    for name, (a, n) in rows.items():
+        a_vec = np.array([a[key] for key in PARAM_KEYS])
+        n_vec = np.array([n[key] for key in PARAM_KEYS])
+        errors[name] = float(np.abs(a_vec - n_vec).max() / max(np.abs(n_vec).max(), 1e-6))
+    return errors
+
+
+@pytest.mark.parametrize("sliders", SLIDER_POINTS)
+def test_tangent_linear_matches_finite_differences(sliders):
+    args = build_simulation_args(sliders)
+    errors = _max_errors(tangent_linear_sensitivities(args), finite_difference_sensitivities(args, FD_STEP))
+    assert {name: error for name, error in errors.items() if error > TOLERANCE} == {}
+
+
+def test_fixed_grouping_reproduces_base_generator():
+    model = two_partner_model(build_simulation_args(BASE_SLIDERS))
+    grouped = liouvillian(model["H_static"], secular_jump_operators(model, secular_grouping(model))).full()
+    default = liouvillian(model["H_static"], secular_jump_operators(model)).full()
+    assert np.allclose(grouped, default, atol=1e-10)
+
+
+def test_degenerate_transitions_give_finite_derivatives():
+    args = build_simulation_args({**BASE_SLIDERS, "mutualCompatability": 0})
+    result = tangent_linear_sensitivities(args)
+    values = list(result["d_health_score"].values())
+    values += [value for row in result["d_metrics"].values() for value in row.values()]
+    assert np.all(np.isfinite(values))
+    # Bounded, not a 1 / GENERATOR_STEP spike from a grouping that flips mid-difference.
+    assert max(abs(value) for value in result["d_health_score"].values()) < 1e3
+
+
+def test_sensitivities_follow_run_backend():
+    args = build_simulation_args(BASE_SLIDERS)
+    result = sensitivities(args)
+    run = run_simulation(args, render_plot=False)
+    assert result["solver"]["solver"] == run["solver"]["solver"]
+    assert result["health_score"] == pytest.approx(run["health_score"], abs=1e-9)
+
+    # Central differences of /run's own score, independent of sensitivities()' step.
+    step = 1e-3
+    numeric = {}
+    for key in ("omega_A", "J_empathy", "drive_amplitude", "drive_freq", "rate_bit_flip_A"):
+        hi = run_simulation({**args, key: args[key] + step}, render_plot=False)["health_score"]
+        lo = run_simulation({**args, key: args[key] - step}, render_plot=False)["health_score"]
+        numeric[key] = (hi - lo) / (2 * step)
+    scale = max(abs(value) for value in numeric.values())
+    for key, value in numeric.items():
+        assert abs(result["d_health_score"][key] - value) <= TOLERANCE * scale, key
+
+
+def test_lindblad_request_uses_tangent_linear_solve():
+    result = sensitivities({**build_simulation_args(BASE_SLIDERS), "solver": "lindblad"})
+    assert result["solver"]["solver"] == "lindblad"
+    assert result["solver"]["method"] == "tangent_linear"